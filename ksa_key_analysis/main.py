@@ -1,7 +1,10 @@
 import os
 import sys
-import subprocess
 from argparse import ArgumentParser
+from utils.generation import dataset_stem, ensure_dataset, make_spec
+from utils.storage import DATASET_FORMATS, open_dataset
+from models.pipeline import (evaluate_ksa_model, generate_ksa_data, print_report, save_model, save_results,
+                             train_ksa_model)
 
 def get_cipher_params(cipher_name):
     """Запрашиваем параметры шифра """
@@ -10,6 +13,7 @@ def get_cipher_params(cipher_name):
     if cipher_name == "PRESENT":
         params['rounds'] = int(input("Введите число раундов (1-32): "))
         params['block_size'] = int(input("Введите длину раундового ключа (8,16,32,48,64): "))
+        params['sboxes'] = int(input("Число S-box в АРК (1-5, по умолчанию 1): ") or 1)
         
     elif cipher_name == "SIMON":
         print("Выберите конфигурацию:")
@@ -99,7 +103,21 @@ def get_training_params():
         'test_samples': int(input("Число пар для теста (рекомендовано 40000): ") or 40000)
     }
 
+def parse_args():
+    """Параметры командной строки (остальное запрашивается интерактивно)"""
+    parser = ArgumentParser(description='Анализ алгоритмов развертывания ключа')
+    parser.add_argument('--workers', type=int, default=1,
+                      help='Число процессов генерации данных')
+    parser.add_argument('--seed', type=int,
+                      help='Seed генерации (данные не зависят от --workers)')
+    parser.add_argument('--format', choices=['npz', 'packed'], default='packed',
+                      help='Формат файла датасета (packed отображается в память, npz загружается целиком)')
+    parser.add_argument('--in_memory', action='store_true',
+                      help='Не сохранять датасет на диск (генерация в памяти)')
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     print("=== Анализ алгоритмов развертывания ключа ===")
     
     while True:
@@ -130,51 +148,36 @@ def main():
             
         train_params = get_training_params()
         
-        # Генерация данных
+        spec = make_spec(cipher_name, cipher_params['block_size'], cipher_params['rounds'],
+                         cipher_params.get('key_size'), cipher_params.get('sboxes', 1))
+        num_samples = train_params['train_samples'] + train_params['test_samples']
+
+        # Все этапы выполняются в одном процессе: данные и модель передаются в памяти
         print("\nГенерация данных...")
-        gen_cmd = [
-            'python', f'scripts/generate_data_{cipher_name.lower()}.py',
-            '--rounds', str(cipher_params['rounds']),
-            '--block_size', str(cipher_params.get('block_size', 64)),
-            '--num_samples', str(train_params['train_samples'] + train_params['test_samples'])
-        ]
-        if cipher_name in ['SIMON', 'SPECK', 'RECTANGLE']:
-            gen_cmd.extend(['--key_size', str(cipher_params['key_size'])])
-        subprocess.run(gen_cmd)
-        
+        if args.in_memory:
+            dataset, _ = generate_ksa_data(spec, num_samples, args.workers, args.seed)
+        else:
+            path = dataset_stem(spec) + DATASET_FORMATS[args.format]
+            ensure_dataset(spec, num_samples, path, args.workers, args.seed)
+            dataset = open_dataset(path)
+        print(f"Готово {len(dataset)} примеров")
+
         # Обучение модели
         if input("\nНачать обучение? (1 - да, 2 - выход): ") == '1':
-            train_cmd = [
-                'python', 'scripts/train_model.py',
-                '--block_size', str(cipher_params['block_size']),
-                '--rounds', str(cipher_params['rounds']),
-                '--cipher', cipher_name,
-                '--epochs', str(train_params['epochs']),
-                '--batch_size', str(train_params['batch_size']),
-                '--train_samples', str(train_params['train_samples']),
-                '--test_samples', str(train_params['test_samples'])
-            ]
-            if cipher_name in ['SIMON', 'SPECK', 'RECTANGLE']:
-                train_cmd.extend(['--key_size', str(cipher_params['key_size'])])
             try:
-                subprocess.run(train_cmd, check=True)
-            except subprocess.CalledProcessError as e:
+                model = train_ksa_model(spec, dataset, train_params['train_samples'], train_params['test_samples'],
+                                        train_params['epochs'], train_params['batch_size'])
+                print(f"Модель сохранена в {save_model(model, spec)}")
+            except Exception as e:
                 print(f"Ошибка при обучении модели: {e}")
                 sys.exit(1)
-            
+
             # Тестирование
             if input("\nПротестировать модель? (1 - да, 2 - выход): ") == '1':
-                test_cmd = [
-                    'python', 'scripts/test_model.py',
-                    '--block_size', str(cipher_params['block_size']),
-                    '--cipher', cipher_name,
-                    '--rounds', str(cipher_params['rounds']),
-                    '--test_samples', str(train_params['test_samples']),
-                    '--train_samples', str(train_params['train_samples'])
-                ]
-                if cipher_name in ['SIMON', 'SPECK', 'RECTANGLE']:
-                    test_cmd.extend(['--key_size', str(cipher_params['key_size'])])
-                subprocess.run(test_cmd)
+                report = evaluate_ksa_model(model, dataset, spec, train_params['train_samples'], num_samples)
+                print_report(report)
+                save_results(report, spec, train_samples=train_params['train_samples'],
+                             test_samples=train_params['test_samples'])
     
     print("Работа завершена.")
 
@@ -0,0 +1,33 @@
+import os
+from utils.generation import spec_suffix
+
+# Параметры моделей и имена файлов результатов. Модуль не импортирует TensorFlow:
+# скрипты разбирают аргументы и проверяют входные файлы до его загрузки.
+
+# Варианты выходного слоя (см. models.ksa_model.build_output_model):
+#   per_bit    - отдельный Dense(2, softmax) на каждый бит ключа (key_bits выходов и функций потерь,
+#                разреженная кросс-энтропия);
+#   multilabel - один Dense(key_bits, sigmoid) с бинарной кросс-энтропией.
+HEADS = ('per_bit', 'multilabel')
+
+# Буфер перемешивания (в примерах): в памяти хранятся только индексы, не данные
+SHUFFLE_BUFFER = 1 << 16
+
+# Примеров в одном батче оценки: память не зависит от размера тестовой выборки
+EVAL_BATCH_SIZE = 8192
+
+# Шифры, размер ключа которых входит в имя файла модели
+KEYED_CIPHERS = ('SIMON', 'SPECK', 'RECTANGLE')
+
+
+def model_path(spec, results_dir="results"):
+    """Файл модели конфигурации spec."""
+    name = f"{spec.cipher.lower()}_{spec.block_size}_{spec.rounds}{spec_suffix(spec)}"
+    if spec.cipher in KEYED_CIPHERS:
+        name += f"_{spec.key_size}"
+    return os.path.join(results_dir, name + ".weights.h5")
+
+
+def report_path(spec, results_dir="results"):
+    """Текстовый отчет тестирования (рядом сохраняются .json и .csv)."""
+    return os.path.join(results_dir, f"test_results_{spec.cipher}_{spec.key_size}bit_{spec.rounds}r{spec_suffix(spec)}.txt")
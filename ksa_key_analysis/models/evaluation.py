@@ -0,0 +1,25 @@
+import numpy as np
+from models.config import EVAL_BATCH_SIZE
+from models.input_pipeline import make_dataset
+from models.ksa_model import predict_key_bits
+from utils import profiling
+
+
+def count_correct_bits(model, dataset, start, stop, key_bits, batch_size=EVAL_BATCH_SIZE):
+    """
+    Потоковая оценка модели на примерах [start, stop) датасета: предсказания
+    считаются по батчам и сразу сворачиваются в счетчики верных битов.
+    :return: (число верных предсказаний каждого бита (key_bits,),
+              число предсказанных единиц каждого бита (key_bits,), число примеров)
+    """
+    correct = np.zeros(key_bits, dtype=np.int64)
+    ones = np.zeros(key_bits, dtype=np.int64)
+    total = 0
+    # Метки multilabel - матрица битов uint8 без преобразований
+    for x, y in make_dataset(dataset, start, stop, batch_size, key_bits, head='multilabel'):
+        with profiling.span('predict', samples=len(x)):
+            predicted = predict_key_bits(model.predict_on_batch(x))
+        correct += np.count_nonzero(predicted == y.numpy(), axis=0)
+        ones += np.count_nonzero(predicted, axis=0)
+        total += len(predicted)
+    return correct, ones, total
@@ -0,0 +1,89 @@
+import numpy as np
+import tensorflow as tf
+from models.config import SHUFFLE_BUFFER
+from utils import profiling
+
+
+def _to_model_inputs(x, y, key_bits, head='per_bit'):
+    """
+    Батч uint8 -> (x float32, метки для выхода head модели, см. models.ksa_model.HEADS).
+    Метки остаются матрицей битов uint8 (функции потерь приводят тип сами):
+    кортеж ее столбцов (per_bit, разреженные метки классов) или сама матрица (multilabel).
+    """
+    if head == 'multilabel':
+        return tf.cast(x, tf.float32), y
+    return tf.cast(x, tf.float32), tuple(tf.unstack(y, num=key_bits, axis=1))
+
+
+def make_dataset(dataset, start, stop, batch_size, key_bits, shuffle=False, with_labels=True,
+                 seed=None, shuffle_buffer=SHUFFLE_BUFFER, head='per_bit'):
+    """
+    tf.data.Dataset батчей (последний раундовый ключ, биты ключа) по примерам [start, stop)
+    датасета utils.storage.open_dataset.
+    Перемешиваются индексы (буфер ограничен shuffle_buffer), строки батча читаются
+    из отображенного в память файла, распаковываются и переводятся в float32 по батчам;
+    следующие батчи готовятся параллельно с обучением (prefetch).
+    :return: батчи x или (x, метки для выхода head)
+    """
+    stop = min(stop, len(dataset))
+    indices = tf.data.Dataset.range(start, stop)
+    if shuffle:
+        indices = indices.shuffle(min(shuffle_buffer, max(stop - start, 1)), seed=seed,
+                                  reshuffle_each_iteration=True)
+    batches = indices.batch(batch_size)
+
+    round_key_bits = dataset.num_bits('last_round_keys')
+
+    def read(rows):
+        with profiling.span('read_batch', samples=len(rows)):
+            # Порядок строк внутри батча не важен: сортировка дает последовательное чтение файла
+            rows = np.sort(rows)
+            x = np.ascontiguousarray(dataset.unpack('last_round_keys', rows))
+            if not with_labels:
+                return x
+            y = np.ascontiguousarray(dataset.unpack('keys', rows)[:, :key_bits])
+            return x, y
+
+    def load(rows):
+        if not with_labels:
+            x = tf.numpy_function(read, [rows], tf.uint8)
+            x.set_shape([None, round_key_bits])
+            return tf.cast(x, tf.float32)
+        x, y = tf.numpy_function(read, [rows], [tf.uint8, tf.uint8])
+        x.set_shape([None, round_key_bits])
+        y.set_shape([None, key_bits])
+        return _to_model_inputs(x, y, key_bits, head)
+
+    return batches.map(load, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+
+def make_array_dataset(key_bits_matrix, round_keys, batch_size, key_bits, head='per_bit'):
+    """tf.data.Dataset батчей по матрицам битов в памяти (например, отложенная выборка)."""
+    batches = tf.data.Dataset.from_tensor_slices((round_keys, key_bits_matrix[:, :key_bits])).batch(batch_size)
+    return batches.map(lambda x, y: _to_model_inputs(x, y, key_bits, head),
+                       num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+
+def make_stream_dataset(stream, batch_size, key_bits, round_key_bits, head='per_bit'):
+    """
+    Бесконечный tf.data.Dataset батчей по потоку шардов (key_bits, last_round_keys),
+    например utils.generation.KeyStream. Шарды режутся на батчи, остаток шарда
+    переносится в следующий батч.
+    """
+
+    def batches():
+        keys = np.empty((0, key_bits), dtype=np.uint8)
+        round_keys = np.empty((0, round_key_bits), dtype=np.uint8)
+        for shard_keys, shard_round_keys in stream:
+            keys = np.concatenate([keys, shard_keys[:, :key_bits]])
+            round_keys = np.concatenate([round_keys, shard_round_keys])
+            full = len(keys) - len(keys) % batch_size
+            for begin in range(0, full, batch_size):
+                yield round_keys[begin:begin + batch_size], keys[begin:begin + batch_size]
+            keys, round_keys = keys[full:], round_keys[full:]
+
+    signature = (tf.TensorSpec((batch_size, round_key_bits), tf.uint8),
+                 tf.TensorSpec((batch_size, key_bits), tf.uint8))
+    return (tf.data.Dataset.from_generator(batches, output_signature=signature)
+            .map(lambda x, y: _to_model_inputs(x, y, key_bits, head), num_parallel_calls=tf.data.AUTOTUNE)
+            .prefetch(tf.data.AUTOTUNE))
@@ -1,7 +1,77 @@
+import numpy as np
+import tensorflow as tf
 from tensorflow.keras.models import Model
 from tensorflow.keras.layers import Input, Dense
+from tensorflow.keras.metrics import Metric
+from tensorflow.keras.utils import register_keras_serializable
+from models.config import HEADS
 
-def build_ksa_model(block_size):
+
+@register_keras_serializable(package='ksa')
+class BitAccuracy(Metric):
+    """
+    Точность предсказания битов ключа для выхода multilabel: счетчики верных
+    предсказаний по всем битам обновляются одной векторной операцией.
+    result() - средняя точность, per_bit() - точность каждого бита.
+    """
+
+    def __init__(self, key_bits, threshold=0.5, name='accuracy', **kwargs):
+        super().__init__(name=name, **kwargs)
+        self.key_bits = key_bits
+        self.threshold = threshold
+        self.correct = self.add_weight(name='correct', shape=(key_bits,), initializer='zeros')
+        self.count = self.add_weight(name='count', shape=(), initializer='zeros')
+
+    def update_state(self, y_true, y_pred, sample_weight=None):
+        predicted = tf.cast(y_pred > self.threshold, tf.float32)
+        hits = tf.cast(tf.equal(predicted, tf.cast(y_true, tf.float32)), tf.float32)
+        self.correct.assign_add(tf.reduce_sum(hits, axis=0))
+        self.count.assign_add(tf.cast(tf.shape(hits)[0], tf.float32))
+
+    def result(self):
+        return tf.reduce_mean(self.correct) / tf.maximum(self.count, 1.0)
+
+    def per_bit(self):
+        return self.correct / tf.maximum(self.count, 1.0)
+
+    def reset_state(self):
+        self.correct.assign(tf.zeros_like(self.correct))
+        self.count.assign(0.0)
+
+    def get_config(self):
+        return dict(super().get_config(), key_bits=self.key_bits, threshold=self.threshold)
+
+
+def build_output_model(inputs, x, key_bits, head='per_bit', **compile_kwargs):
+    """
+    Выходной слой (см. HEADS) поверх скрытых слоев x и компиляция модели.
+    :param compile_kwargs: параметры model.compile (optimizer, jit_compile и т. д.)
+    """
+    if head not in HEADS:
+        raise ValueError(f"Unsupported head: {head}")
+    compile_kwargs.setdefault('optimizer', 'adam')
+    # Выход считается в float32 и при смешанной точности (устойчивость функции потерь)
+    if head == 'per_bit':
+        outputs = [Dense(2, activation='softmax', dtype='float32', name=f"bit_{i}_output")(x)
+                   for i in range(key_bits)]
+        model = Model(inputs=inputs, outputs=outputs)
+        # Метки - номера классов (биты uint8), one-hot не требуется
+        model.compile(loss='sparse_categorical_crossentropy', metrics=['accuracy'] * key_bits, **compile_kwargs)
+    else:
+        outputs = Dense(key_bits, activation='sigmoid', dtype='float32', name="key_bits_output")(x)
+        model = Model(inputs=inputs, outputs=outputs)
+        model.compile(loss='binary_crossentropy', metrics=[BitAccuracy(key_bits)], **compile_kwargs)
+    return model
+
+
+def predict_key_bits(predictions):
+    """Биты ключа (N, key_bits) по результату model.predict модели любого варианта выхода."""
+    if isinstance(predictions, (list, tuple)):
+        return np.stack([np.argmax(p, axis=1) for p in predictions], axis=1).astype(np.uint8)
+    return (predictions > 0.5).astype(np.uint8)
+
+
+def build_ksa_model(block_size, head='per_bit', **compile_kwargs):
     """Создает модель в зависимости от размера блока"""
     inputs = Input(shape=(block_size,), name="input_layer")
     
@@ -36,13 +106,9 @@ def build_ksa_model(block_size):
     
     # Выходной слой - предсказание битов ключа
    # key_size = block_size  # Для SmallPresent размер ключа равен размеру блока
-    outputs = [Dense(2, activation='softmax', name=f"bit_{i}_output")(x) for i in range(80)]
-    
-    model = Model(inputs=inputs, outputs=outputs)
-    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'] * 80)
-    return model
+    return build_output_model(inputs, x, 80, head, **compile_kwargs)
     
-def build_simon_ksa_model(block_size, key_size):
+def build_simon_ksa_model(block_size, key_size, head='per_bit', **compile_kwargs):
     n = block_size // 2  # Размер раундового ключа = n
     inputs = Input(shape=(n,), name="input_layer")
     
@@ -69,16 +135,12 @@ def build_simon_ksa_model(block_size, key_size):
         raise ValueError(f"Unsupported block size: {block_size}")
     
     # Выходной слой: key_size бинарных классификаторов
-    outputs = [Dense(2, activation='softmax', name=f"bit_{i}_output")(x) for i in range(key_size)]
-    
-    model = Model(inputs=inputs, outputs=outputs)
-    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'] * key_size)
-    return model
+    return build_output_model(inputs, x, key_size, head, **compile_kwargs)
     
 from tensorflow.keras.models import Model
 from tensorflow.keras.layers import Input, Dense
 
-def build_speck_ksa_model(block_size, key_size):
+def build_speck_ksa_model(block_size, key_size, head='per_bit', **compile_kwargs):
     """Создает модель для анализа ключей SPECK."""
     n = block_size // 2  # Размер раундового ключа
     
@@ -96,19 +158,12 @@ def build_speck_ksa_model(block_size, key_size):
         x = Dense(256, activation='relu')(x)
         x = Dense(128, activation='relu')(x)
     
-    outputs = [Dense(2, activation='softmax', name=f"bit_{i}_output")(x) 
-              for i in range(key_size)]
-    
-    model = Model(inputs=inputs, outputs=outputs)
-    model.compile(optimizer='adam',
-                loss='categorical_crossentropy',
-                metrics=['accuracy'] * key_size)
-    return model
+    return build_output_model(inputs, x, key_size, head, **compile_kwargs)
     
 from tensorflow.keras.models import Model
 from tensorflow.keras.layers import Input, Dense
 
-def build_gift_ksa_model(block_size):
+def build_gift_ksa_model(block_size, head='per_bit', **compile_kwargs):
     n = block_size // 2
     inputs = Input(shape=(block_size,))
     
@@ -125,16 +180,12 @@ def build_gift_ksa_model(block_size):
         raise ValueError(f"Unsupported block size: {block_size}")
     
     # Выходной слой - предсказание 128 бит ключа
-    outputs = [Dense(2, activation='softmax', name=f"bit_{i}_output")(x) for i in range(128)]
-    
-    model = Model(inputs=inputs, outputs=outputs)
-    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'] * 128)
-    return model
+    return build_output_model(inputs, x, 128, head, **compile_kwargs)
     
 from tensorflow.keras.models import Model
 from tensorflow.keras.layers import Input, Dense
 
-def build_rectangle_ksa_model(block_size, key_size):
+def build_rectangle_ksa_model(block_size, key_size, head='per_bit', **compile_kwargs):
     inputs = Input(shape=(block_size,))
     
     # Архитектура зависит от размера блока
@@ -143,8 +194,4 @@ def build_rectangle_ksa_model(block_size, key_size):
     x = Dense(8, activation='relu')(x)
 
     # Выходной слой - предсказание 128 бит ключа
-    outputs = [Dense(2, activation='softmax', name=f"bit_{i}_output")(x) for i in range(key_size)]
-    
-    model = Model(inputs=inputs, outputs=outputs)
-    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'] * key_size)
-    return model
+    return build_output_model(inputs, x, key_size, head, **compile_kwargs)
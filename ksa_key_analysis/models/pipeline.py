@@ -0,0 +1,138 @@
+import os
+from utils import profiling
+from utils.generation import generate_dataset, spec_suffix
+from utils.stats import bit_report, save_report
+from utils.storage import ArrayDataset
+from models.config import EVAL_BATCH_SIZE, KEYED_CIPHERS, SHUFFLE_BUFFER, model_path, report_path
+
+# TensorFlow (models.ksa_model, models.input_pipeline и др.) импортируется внутри функций,
+# которым нужна модель: генерация данных и отчеты не тратят время на его загрузку.
+
+# Построители моделей (models/ksa_model.py); для шифров с выбором размера ключа он передается явно
+MODEL_BUILDERS = {
+    'PRESENT': 'build_ksa_model',
+    'SIMON': 'build_simon_ksa_model',
+    'SPECK': 'build_speck_ksa_model',
+    'GIFT': 'build_gift_ksa_model',
+    'RECTANGLE': 'build_rectangle_ksa_model',
+}
+
+
+def generate_ksa_data(spec, num_samples, workers=1, seed=None):
+    """
+    Генерация датасета в памяти (без записи на диск); тот же датасет, что
+    utils.generation.ensure_dataset записал бы в файл с данным seed.
+    :return: (ArrayDataset, entropy)
+    """
+    keys, round_keys, entropy = generate_dataset(spec, num_samples, workers, seed)
+    return ArrayDataset(keys, round_keys), entropy
+
+
+def build_model(spec, head='per_bit', **compile_kwargs):
+    """Модель конфигурации spec (см. models.ksa_model.build_output_model)."""
+    from models import ksa_model
+    builder = getattr(ksa_model, MODEL_BUILDERS[spec.cipher])
+    with profiling.span('build_model'):
+        if spec.cipher in KEYED_CIPHERS:
+            return builder(spec.block_size, spec.key_size, head=head, **compile_kwargs)
+        return builder(spec.block_size, head=head, **compile_kwargs)
+
+
+def fit_model(model, train_data, validation_data, epochs=100, batch_size=200, steps_per_epoch=None,
+              patience=10, verbose=2, callbacks=()):
+    """
+    Обучение с ранней остановкой по val_loss, выводом скорости обучения и точности
+    каждого бита на валидации в конце (val_loss есть у обоих выходных слоев;
+    per_bit не дает общей val_accuracy, multilabel - только среднюю).
+    """
+    from tensorflow.keras.callbacks import EarlyStopping
+    from models.training import BitAccuracyReport, ThroughputLogger
+    with profiling.span('fit', epochs=epochs):
+        return model.fit(
+            train_data,
+            validation_data=validation_data,
+            epochs=epochs,
+            steps_per_epoch=steps_per_epoch,
+            callbacks=[EarlyStopping(monitor='val_loss', mode='min', patience=patience, restore_best_weights=True),
+                       ThroughputLogger(batch_size), BitAccuracyReport(validation_data)] + list(callbacks),
+            verbose=verbose
+        )
+
+
+def train_ksa_model(spec, dataset, train_samples, test_samples, epochs=100, batch_size=200, head='per_bit',
+                    shuffle_buffer=SHUFFLE_BUFFER, verbose=2, callbacks=(), **compile_kwargs):
+    """
+    Построение и обучение модели на датасете (файл utils.storage.open_dataset или
+    результат generate_ksa_data): первые train_samples примеров - обучение,
+    следующие test_samples - валидация. callbacks - дополнительные обратные вызовы Keras.
+    :return: обученная модель
+    """
+    from models.input_pipeline import make_dataset
+    train_data = make_dataset(dataset, 0, train_samples, batch_size, spec.key_size,
+                              shuffle=True, shuffle_buffer=shuffle_buffer, head=head)
+    test_data = make_dataset(dataset, train_samples, train_samples + test_samples, batch_size,
+                             spec.key_size, head=head)
+    model = build_model(spec, head, **compile_kwargs)
+    fit_model(model, train_data, test_data, epochs, batch_size, verbose=verbose, callbacks=callbacks)
+    return model
+
+
+def save_model(model, spec, results_dir="results"):
+    os.makedirs(results_dir, exist_ok=True)
+    path = model_path(spec, results_dir)
+    with profiling.span('save_model'):
+        model.save(path)
+    return path
+
+
+def load_ksa_model(spec, results_dir="results"):
+    """Сохраненная модель (только для предсказания, любой вариант выходного слоя)."""
+    with profiling.span('import_tensorflow'):
+        from tensorflow.keras.models import load_model
+    with profiling.span('load_model'):
+        return load_model(model_path(spec, results_dir), compile=False)
+
+
+def evaluate_ksa_model(model, dataset, spec, start, stop, batch_size=EVAL_BATCH_SIZE,
+                       confidence=0.95, ci_method='wilson'):
+    """
+    Потоковая оценка модели на примерах [start, stop) датасета.
+    :return: отчет utils.stats.bit_report
+    """
+    from models.evaluation import count_correct_bits
+    correct, ones, total = count_correct_bits(model, dataset, start, stop, spec.key_size, batch_size)
+    with profiling.span('report'):
+        return bit_report(correct, ones, total, confidence, ci_method)
+
+
+def significance_line(report):
+    return (f"Значимо предсказуемых бит ({report['confidence']:.0%}): {report['significant_bits']}, "
+            f"с поправкой Бонферрони: {report['significant_bits_bonferroni']}")
+
+
+def print_report(report):
+    print("\nТочность по битам:")
+    for bit, accuracy in enumerate(report['bits']['accuracy']):
+        print(f"Bit {bit:3d}: {accuracy:.2%}")
+    print(f"\nСредняя точность: {report['mean_accuracy']:.2%}")
+    print(significance_line(report))
+
+
+def save_results(report, spec, results_dir="results", **config):
+    """
+    Отчет тестирования: текст (конфигурация, средняя точность, точность по битам)
+    и те же результаты в .json и .csv для автоматической обработки.
+    :return: путь к текстовому отчету
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    result_file = report_path(spec, results_dir)
+    with open(result_file, "w") as f:
+        f.write(f"Конфигурация: {spec.cipher}_{spec.block_size}/{spec.key_size}/{spec.rounds}r{spec_suffix(spec)}\n")
+        f.write(f"Средняя точность: {report['mean_accuracy'] * 100:.2f}%\n")
+        f.write(f"{significance_line(report)}\n")
+        f.write("Точность по битам:\n")
+        for bit, accuracy in enumerate(report['bits']['accuracy']):
+            f.write(f"Bit {bit:3d}: {accuracy:.2%}\n")
+    stem = os.path.splitext(result_file)[0]
+    save_report(report, stem + ".json", stem + ".csv", **dict(spec._asdict(), **config))
+    return result_file
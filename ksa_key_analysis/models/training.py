@@ -0,0 +1,141 @@
+import time
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback
+
+# Шагов обучения за один вызов скомпилированной функции в быстром режиме
+FAST_STEPS_PER_EXECUTION = 32
+
+# Флаги /proc/cpuinfo, означающие аппаратную поддержку bfloat16
+BF16_CPU_FLAGS = ('avx512_bf16', 'amx_bf16')
+
+
+def cpu_supports_bf16():
+    """Поддерживает ли процессор вычисления в bfloat16 (только Linux, иначе False)."""
+    try:
+        with open('/proc/cpuinfo') as f:
+            flags = f.read().split()
+    except OSError:
+        return False
+    return any(flag in flags for flag in BF16_CPU_FLAGS)
+
+
+def configure_cpu(intra_op_threads=None, inter_op_threads=None, bf16=False):
+    """
+    Настройка TensorFlow для обучения на CPU; вызывается до первой операции TensorFlow.
+    :param intra_op_threads: потоков внутри одной операции (None - по умолчанию)
+    :param inter_op_threads: параллельно выполняемых операций (None - по умолчанию)
+    :param bf16: смешанная точность mixed_bfloat16, если процессор ее поддерживает
+    :return: включена ли смешанная точность
+    """
+    if intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    if inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    if not bf16:
+        return False
+    if not cpu_supports_bf16():
+        print("Процессор не поддерживает bfloat16, обучение в float32")
+        return False
+    tf.keras.mixed_precision.set_global_policy('mixed_bfloat16')
+    return True
+
+
+def fast_compile_kwargs(steps_per_execution=None):
+    """Параметры model.compile быстрого режима: XLA и несколько шагов за вызов."""
+    return {
+        'jit_compile': True,
+        'steps_per_execution': steps_per_execution or FAST_STEPS_PER_EXECUTION,
+    }
+
+
+class ThroughputLogger(Callback):
+    """Скорость обучения (примеров в секунду) за каждую эпоху, без учета валидации."""
+
+    def __init__(self, batch_size):
+        super().__init__()
+        self.batch_size = batch_size
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.start = time.perf_counter()
+        self.end = self.start
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.end = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        samples = (self.params.get('steps') or 0) * self.batch_size
+        elapsed = self.end - self.start
+        if samples and elapsed > 0:
+            print(f"Эпоха {epoch + 1}: {samples / elapsed:.0f} примеров/с")
+
+
+class BitAccuracyReport(Callback):
+    """
+    Точность каждого бита ключа на валидационных данных в конце обучения (после
+    восстановления лучших весов EarlyStopping) - BitAccuracy.per_bit по предсказаниям
+    модели с любым выходным слоем. Результат выводится и сохраняется в self.accuracy.
+    """
+
+    def __init__(self, validation_data):
+        super().__init__()
+        self.validation_data = validation_data
+        self.accuracy = None
+
+    def on_train_end(self, logs=None):
+        from models.ksa_model import BitAccuracy, predict_key_bits
+        metric = None
+        for x, y in self.validation_data:
+            predicted = predict_key_bits(self.model.predict_on_batch(x))
+            if isinstance(y, (tuple, list)):
+                # Метки per_bit - кортеж столбцов
+                y = tf.stack(y, axis=1)
+            if metric is None:
+                metric = BitAccuracy(predicted.shape[1])
+            metric.update_state(y, predicted)
+        if metric is None:
+            return
+        self.accuracy = metric.per_bit().numpy()
+        print(f"Точность битов на валидации (средняя {self.accuracy.mean():.4f}, "
+              f"от {self.accuracy.min():.4f} до {self.accuracy.max():.4f}):")
+        for start in range(0, len(self.accuracy), 16):
+            values = " ".join(f"{value:.3f}" for value in self.accuracy[start:start + 16])
+            print(f"  биты {start:3d}-{min(start + 16, len(self.accuracy)) - 1:3d}: {values}")
+
+
+class ProfilerWindow(Callback):
+    """
+    Профилировщик TensorFlow на шагах обучения [start_step, stop_step) (счет по всем эпохам);
+    результат - в log_dir (просмотр в TensorBoard, вкладка Profile).
+    """
+
+    def __init__(self, log_dir, start_step, stop_step):
+        super().__init__()
+        if not 0 <= start_step < stop_step:
+            raise ValueError(f"Invalid profiler window: [{start_step}, {stop_step})")
+        self.log_dir = log_dir
+        self.start_step = start_step
+        self.stop_step = stop_step
+        self.step = 0
+        self.active = False
+        self.done = False
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if not self.active and not self.done and self.step >= self.start_step:
+            tf.profiler.experimental.start(self.log_dir)
+            self.active = True
+
+    def on_train_batch_end(self, batch, logs=None):
+        # При steps_per_execution > 1 вызов охватывает несколько шагов
+        self.step += getattr(self.model, 'steps_per_execution', 1)
+        if self.active and self.step >= self.stop_step:
+            self._stop()
+
+    def on_train_end(self, logs=None):
+        if self.active:
+            self._stop()
+
+    def _stop(self):
+        tf.profiler.experimental.stop()
+        self.active = False
+        self.done = True
+        print(f"Профиль TensorFlow сохранен в {self.log_dir}")
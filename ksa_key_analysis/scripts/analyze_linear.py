@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+from utils.generation import make_spec
+from utils.linear import LINEAR_CIPHERS, analyze_affine, load_affine
+from utils.stats import exact_report
+from models.pipeline import print_report, save_results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Точный анализ над GF(2) линейных АРК (GIFT, SIMON): какие биты ключа '
+                    'определяются последним раундовым ключом')
+    parser.add_argument('--cipher', type=str, required=True, choices=LINEAR_CIPHERS, help='Тип шифра')
+    parser.add_argument('--block_size', type=int, required=True, help='Размер блока')
+    parser.add_argument('--rounds', type=int, required=True, help='Число раундов')
+    parser.add_argument('--key_size', type=int, help='Размер ключа (требуется для SIMON)')
+    parser.add_argument('--results_dir', type=str, default='results/gf2',
+                        help='Каталог отчета (формат - как у test_model.py)')
+    args = parser.parse_args()
+
+    if args.cipher == 'SIMON' and not args.key_size:
+        parser.error(f"Для {args.cipher} требуется --key_size")
+
+    spec = make_spec(args.cipher, args.block_size, args.rounds, args.key_size)
+    start = time.perf_counter()
+    analysis = analyze_affine(load_affine(spec.cipher, spec.block_size, spec.key_size, spec.rounds))
+    elapsed = time.perf_counter() - start
+
+    determined_bits = np.flatnonzero(analysis.determined).tolist()
+    print(f"{spec.cipher}{spec.block_size}/{spec.key_size}, {spec.rounds} раундов ({elapsed * 1000:.1f} мс)")
+    print(f"Ранг системы: {analysis.rank} из {spec.key_size}")
+    print(f"Размерность ядра (оставшееся пространство ключей): 2^{analysis.kernel_dimension}")
+    print(f"Определенных бит ключа: {len(determined_bits)}, "
+          f"определенных сумм битов, не сводящихся к одному биту: {analysis.rank - len(determined_bits)}")
+
+    report = exact_report(analysis.determined)
+    print_report(report)
+    result_file = save_results(report, spec, args.results_dir, method='gf2', rank=analysis.rank,
+                               kernel_dimension=analysis.kernel_dimension, determined_bits=determined_bits,
+                               # Строка ступенчатого вида - номера битов ключа, сумма которых определена
+                               determined_sums=[np.flatnonzero(row).tolist() for row in analysis.basis])
+    print(f"Отчет сохранен в {result_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.bitcodec import key_bits_to_ints, sample_keys
+from utils.generation import SHARD_SIZE, generate_dataset, last_round_keys, make_spec
+from utils.gift import GiftCipher
+from utils.rectangle import RectangleCipher
+from utils.simon import SimonCipher
+from utils.smallpresent import SmallPresent
+from utils.speck import SpeckCipher
+
+# Версия формата файла результатов: сравниваются только файлы одной версии
+BENCHMARK_VERSION = 1
+
+STAGES = ('keys', 'generation', 'training', 'inference')
+
+# Конфигурации шифров (как в main.py): (шифр, блок, ключ)
+CONFIGURATIONS = (
+    [('PRESENT', block_size, 80) for block_size in (8, 16, 32, 48, 64)]
+    + [(cipher, block_size, key_size) for cipher in ('SIMON', 'SPECK')
+       for block_size, key_size in ((32, 64), (48, 72), (48, 96), (64, 96), (64, 128),
+                                    (96, 96), (96, 144), (128, 128), (128, 192), (128, 256))]
+    + [('GIFT', 64, 128), ('GIFT', 128, 128), ('RECTANGLE', 64, 80), ('RECTANGLE', 64, 128)]
+)
+
+# Метрики: суффикс -> True, если большее значение лучше
+METRIC_DIRECTIONS = {'_per_sec': True, '_ms': False}
+
+BATCH_KEYS = SHARD_SIZE
+GENERATION_SAMPLES = 2 * SHARD_SIZE
+TRAIN_SAMPLES = 1 << 15
+TRAIN_BATCH_SIZE = 200
+INFERENCE_BATCH_SIZE = 8192
+
+
+def scalar_cipher(cipher, block_size, key_size):
+    """Скалярная реализация АРК и стандартное число раундов."""
+    if cipher == 'PRESENT':
+        return SmallPresent(block_size), 32
+    if cipher == 'SIMON':
+        instance = SimonCipher(block_size, key_size)
+    elif cipher == 'SPECK':
+        instance = SpeckCipher(block_size, key_size)
+    elif cipher == 'GIFT':
+        instance = GiftCipher(block_size)
+    else:
+        instance = RectangleCipher(block_size, key_size)
+    return instance, instance.rounds
+
+
+def rate(function, count, min_time):
+    """Число операций в секунду: function() выполняет count операций и повторяется не менее min_time секунд."""
+    function()
+    calls, start = 0, time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls * count / elapsed
+
+
+def bench_keys(spec, instance, rng, min_time):
+    """Развертываний ключа в секунду: скалярная реализация, пакетный метод класса и движок генерации."""
+    key_bits = sample_keys(BATCH_KEYS, spec.key_size, rng)
+    scalar_keys = key_bits_to_ints(key_bits[:1000])
+    results = {
+        'scalar_keys_per_sec': rate(
+            lambda: [instance.generate_round_keys(key, spec.rounds) for key in scalar_keys[:100]], 100, min_time),
+        'engine_keys_per_sec': rate(lambda: last_round_keys(spec, key_bits), BATCH_KEYS, min_time),
+    }
+    if hasattr(instance, 'generate_round_keys_batch'):
+        results['batch_keys_per_sec'] = rate(
+            lambda: instance.generate_round_keys_batch(key_bits, spec.rounds), BATCH_KEYS, min_time)
+    return results
+
+
+def bench_generation(spec, min_time):
+    """Генерация датасета в памяти (ключи, АРК, биты), примеров в секунду."""
+    return {'generation_samples_per_sec': rate(
+        lambda: generate_dataset(spec, GENERATION_SAMPLES, seed=0), GENERATION_SAMPLES, min_time)}
+
+
+def bench_model(spec, head, rng, min_time, training=True, inference=True):
+    """Скорость обучения (после компиляции) и задержка/пропускная способность предсказания."""
+    from models.input_pipeline import make_array_dataset
+    from models.pipeline import build_model
+
+    key_bits = sample_keys(TRAIN_SAMPLES, spec.key_size, rng)
+    round_keys = last_round_keys(spec, key_bits)
+    train_data = make_array_dataset(key_bits, round_keys, TRAIN_BATCH_SIZE, spec.key_size, head).cache()
+    model = build_model(spec, head)
+    results = {}
+    if training:
+        # Первая эпоха включает построение графа
+        model.fit(train_data, epochs=1, verbose=0)
+        epochs, start = 0, time.perf_counter()
+        while epochs == 0 or time.perf_counter() - start < min_time:
+            model.fit(train_data, epochs=1, verbose=0)
+            epochs += 1
+        results['train_samples_per_sec'] = epochs * TRAIN_SAMPLES / (time.perf_counter() - start)
+    if not inference:
+        return results
+
+    single = round_keys[:1].astype(np.float32)
+    batch = np.resize(round_keys, (INFERENCE_BATCH_SIZE, round_keys.shape[1])).astype(np.float32)
+    model.predict_on_batch(single)
+    latencies = []
+    for _ in range(100):
+        start = time.perf_counter()
+        model.predict_on_batch(single)
+        latencies.append(time.perf_counter() - start)
+    results['inference_latency_ms'] = float(np.median(latencies)) * 1000
+    results['inference_samples_per_sec'] = rate(lambda: model.predict_on_batch(batch), INFERENCE_BATCH_SIZE, min_time)
+    return results
+
+
+def environment():
+    """Сведения о среде выполнения для файла результатов."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    info = {'git_commit': commit, 'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(), 'cpu_count': os.cpu_count()}
+    if 'tensorflow' in sys.modules:
+        info['tensorflow'] = sys.modules['tensorflow'].__version__
+    return info
+
+
+def run_benchmarks(configurations, stages, head, min_time, seed):
+    rng = np.random.default_rng(seed)
+    results = {}
+    for cipher, block_size, key_size in configurations:
+        instance, rounds = scalar_cipher(cipher, block_size, key_size)
+        spec = make_spec(cipher, block_size, rounds, key_size)
+        name = f"{cipher}_{block_size}_{key_size}_{rounds}"
+        entry = results[name] = {}
+        if 'keys' in stages:
+            entry.update(bench_keys(spec, instance, rng, min_time))
+        if 'generation' in stages:
+            entry.update(bench_generation(spec, min_time))
+        if 'training' in stages or 'inference' in stages:
+            entry.update(bench_model(spec, head, rng, min_time, 'training' in stages, 'inference' in stages))
+        print(name + ": " + ", ".join(f"{metric}={value:.4g}" for metric, value in entry.items()), flush=True)
+    return results
+
+
+def higher_is_better(metric):
+    for suffix, direction in METRIC_DIRECTIONS.items():
+        if metric.endswith(suffix):
+            return direction
+    raise ValueError(f"Unknown metric direction: {metric}")
+
+
+def compare(baseline, current, tolerance):
+    """
+    Сравнение результатов с базовыми: регрессия - ухудшение метрики более чем на tolerance (доля).
+    :return: список регрессий (конфигурация, метрика, базовое значение, текущее значение)
+    """
+    if baseline['version'] != current['version']:
+        raise ValueError(f"Benchmark versions differ: {baseline['version']} != {current['version']}")
+    regressions = []
+    for name, metrics in current['results'].items():
+        for metric, value in metrics.items():
+            base = baseline['results'].get(name, {}).get(metric)
+            if base is None:
+                continue
+            change = value / base - 1 if base else 0.0
+            worse = -change if higher_is_better(metric) else change
+            flag = "РЕГРЕССИЯ" if worse > tolerance else ""
+            if flag:
+                regressions.append((name, metric, base, value))
+            print(f"{name:28s} {metric:28s} {base:12.4g} -> {value:12.4g} {change:+8.1%} {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарки АРК, генерации данных, обучения и предсказания')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES), help='Измеряемые этапы')
+    parser.add_argument('--cipher', nargs='+', choices=sorted({c for c, _, _ in CONFIGURATIONS}),
+                        help='Только указанные шифры')
+    parser.add_argument('--head', type=str, default='multilabel', choices=['per_bit', 'multilabel'],
+                        help='Выходной слой моделей')
+    parser.add_argument('--min_time', type=float, default=0.5, help='Минимальное время измерения (секунды)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed случайных ключей')
+    parser.add_argument('--output', type=str, default='results/benchmark.json', help='Файл результатов (JSON)')
+    parser.add_argument('--compare', type=str, help='Базовый файл результатов для поиска регрессий')
+    parser.add_argument('--current', type=str,
+                        help='Сравнить готовый файл результатов с --compare без запуска бенчмарков')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Допустимое ухудшение метрики (доля) при сравнении')
+    args = parser.parse_args()
+
+    if args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        configurations = [config for config in CONFIGURATIONS if not args.cipher or config[0] in args.cipher]
+        results = run_benchmarks(configurations, args.stages, args.head, args.min_time, args.seed)
+        current = {
+            'version': BENCHMARK_VERSION,
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'environment': environment(),
+            'settings': {'stages': args.stages, 'head': args.head, 'min_time': args.min_time, 'seed': args.seed},
+            'results': results,
+        }
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Результаты сохранены в {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.tolerance)
+        if regressions:
+            print(f"\nРегрессий: {len(regressions)} (допуск {args.tolerance:.0%})")
+            sys.exit(1)
+        print("\nРегрессий нет")
+
+
+if __name__ == "__main__":
+    main()
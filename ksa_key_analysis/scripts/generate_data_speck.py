@@ -2,36 +2,47 @@ import argparse
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-import numpy as np
-from utils.speck import SpeckCipher
+from utils.generation import dataset_stem, ensure_dataset, format_rounds, make_spec, parse_rounds
+from utils import profiling
+from utils.storage import DATASET_FORMATS
 
-def generate_ksa_data(num_samples, block_size, key_size, rounds):
+def generate_ksa_data(num_samples, block_size, key_size, rounds, workers=1, seed=None, data_format='packed', force=False, trajectory=None, verify=False):
     """Генерация данных для обучения."""
-    cipher = SpeckCipher(block_size, key_size)
-    key_bits = np.random.randint(0, 2, size=(num_samples, key_size), dtype=np.uint8)
-    last_round_keys = np.zeros((num_samples, cipher.word_size), dtype=np.uint8)
-
-    for i in range(num_samples):
-        master_key = int(''.join(map(str, key_bits[i])), 2)
-        round_keys = cipher.generate_round_keys(master_key, rounds)
-        last_key = round_keys[-1]
-        last_round_keys[i] = [(last_key >> j) & 1 for j in range(cipher.word_size)]
-
-    os.makedirs("data", exist_ok=True)
-    np.savez_compressed(
-        f"data/speck_{block_size}_{key_size}_{rounds}_keys.npz",
-        keys=key_bits,
-        last_round_keys=last_round_keys
-    )
+    spec = make_spec('SPECK', block_size, rounds, key_size, trajectory=trajectory)
+    num_samples, _ = ensure_dataset(spec, num_samples, dataset_stem(spec) + DATASET_FORMATS[data_format], workers, seed, force, verify)
     print(f"Сгенерировано {num_samples} примеров для Speck{block_size}/{key_size}.")
+    if spec.trajectory:
+        print(f"Датасет-траектория: ключи раундов {format_rounds(spec.trajectory)}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument('--rounds', type=int, required=True)
+    parser.add_argument('--rounds', type=int)
     parser.add_argument('--block_size', type=int, required=True)
     parser.add_argument('--key_size', type=int, required=True)
     parser.add_argument('--num_samples', type=int, required=True)
+    parser.add_argument('--workers', type=int, default=1, help='Число процессов генерации')
+    parser.add_argument('--seed', type=int, help='Seed (результат не зависит от --workers)')
+    parser.add_argument('--format', choices=list(DATASET_FORMATS), default='packed',
+                        help='Формат файла: packed (упакованные биты, mmap - датасеты больше памяти) '
+                             'или npz (сжатый, загружается целиком)')
+    parser.add_argument('--force', action='store_true',
+                        help='Сгенерировать заново, даже если подходящий датасет уже есть')
+    parser.add_argument('--verify', action='store_true',
+                        help='Пересчитать контрольную сумму существующего датасета (по умолчанию - только при '
+                             'изменении размера или времени изменения файла)')
+    parser.add_argument('--trajectory', nargs='+',
+                        help='Датасет-траектория: ключи всех указанных раундов за один проход (например, 1-10); '
+                             'заменяет --rounds')
+    parser.add_argument('--profile', action='store_true',
+                        help='Время и пиковая память этапов, трасса JSON в data/')
     args = parser.parse_args()
+    if args.rounds is None and not args.trajectory:
+        parser.error("Требуется --rounds или --trajectory")
     
-    generate_ksa_data(args.num_samples, args.block_size, args.key_size, args.rounds)  
+    profiler = profiling.start("generate_speck", args.profile)
+    try:
+        generate_ksa_data(args.num_samples, args.block_size, args.key_size, args.rounds, args.workers, args.seed, args.format, args.force,
+                          parse_rounds(args.trajectory or []), args.verify)
+    finally:
+        profiler.finish("data")
 
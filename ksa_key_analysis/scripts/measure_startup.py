@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Точки входа, которые должны запускаться без загрузки TensorFlow (проверяется на --help)
+ENTRY_POINTS = [
+    'main.py',
+    'sweep.py',
+    'scripts/train_model.py',
+    'scripts/test_model.py',
+    'scripts/generate_data_present.py',
+    'scripts/generate_data_simon.py',
+    'scripts/generate_data_speck.py',
+    'scripts/generate_data_gift.py',
+    'scripts/generate_data_rectangle.py',
+]
+
+# Для сравнения: запуск интерпретатора и импорт TensorFlow
+REFERENCE = {
+    'python': ['-c', 'pass'],
+    'import tensorflow': ['-c', 'import tensorflow'],
+}
+
+
+def run_time(args, repeat):
+    """Медиана времени выполнения python args (секунды)."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def imports_tensorflow(script):
+    """Загружает ли script --help модуль tensorflow (по журналу python -X importtime)."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', script, '--help'], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return any(line.rsplit('|', 1)[-1].strip() == 'tensorflow' for line in result.stderr.splitlines())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Время запуска скриптов (--help) без загрузки TensorFlow')
+    parser.add_argument('--repeat', type=int, default=5, help='Число запусков каждого скрипта (берется медиана)')
+    parser.add_argument('--max_seconds', type=float, default=2.0,
+                        help='Порог времени запуска: превышение считается регрессией')
+    parser.add_argument('--skip_reference', action='store_true', help='Не измерять импорт TensorFlow для сравнения')
+    parser.add_argument('--output', type=str, help='JSON-файл для сохранения результатов')
+    args = parser.parse_args()
+
+    results = {}
+    if not args.skip_reference:
+        for name, command in REFERENCE.items():
+            results[name] = {'seconds': run_time(command, args.repeat)}
+            print(f"{name:36s} {results[name]['seconds']:7.3f} с")
+
+    failed = []
+    for script in ENTRY_POINTS:
+        seconds = run_time([script, '--help'], args.repeat)
+        tensorflow = imports_tensorflow(script)
+        results[script] = {'seconds': seconds, 'imports_tensorflow': tensorflow}
+        problems = []
+        if tensorflow:
+            problems.append("загружает TensorFlow")
+        if seconds > args.max_seconds:
+            problems.append(f"дольше {args.max_seconds} с")
+        if problems:
+            failed.append(script)
+        print(f"{script:36s} {seconds:7.3f} с  {', '.join(problems) or 'OK'}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version, 'max_seconds': args.max_seconds, 'results': results}, f, indent=2)
+
+    if failed:
+        print(f"\nРегрессия времени запуска: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
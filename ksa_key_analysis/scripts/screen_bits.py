@@ -0,0 +1,74 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.screening import MAX_GROUP_SIZE, screen_dataset
+from utils.storage import open_dataset
+
+
+def dataset_name(path):
+    """Конфигурация по имени файла: data/simon_32_64_32_keys.npz -> simon_32_64_32."""
+    name = os.path.basename(path)
+    for suffix in ('.npz', '.packed'):
+        name = name[:-len(suffix)] if name.endswith(suffix) else name
+    return name[:-len('_keys')] if name.endswith('_keys') else name
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Скрининг зависимости битов ключа от последнего раундового ключа '
+                    '(взаимная информация, корреляция, G-критерий) до обучения')
+    parser.add_argument('datasets', nargs='*',
+                        help='Файлы датасетов (.npz или .packed); по умолчанию все датасеты в data/')
+    parser.add_argument('--group_size', type=int, nargs='+', default=[1],
+                        help=f'Размеры групп соседних бит раундового ключа (1-{MAX_GROUP_SIZE})')
+    parser.add_argument('--alpha', type=float, default=0.01,
+                        help='Уровень значимости (с поправкой Бонферрони на число пар бит)')
+    parser.add_argument('--max_samples', type=int, help='Использовать не более N первых примеров')
+    parser.add_argument('--output', type=str, help='JSON-файл с результатами по всем датасетам')
+    parser.add_argument('--csv_dir', type=str, help='Каталог для CSV по битам ключа (файл на датасет и размер группы)')
+    args = parser.parse_args()
+
+    paths = args.datasets or sorted(glob.glob('data/*_keys.npz') + glob.glob('data/*_keys.packed'))
+    if not paths:
+        parser.error("Датасеты не найдены")
+
+    results = []
+    print(f"{'Датасет':36s} {'группа':>6s} {'примеров':>10s} {'бит':>5s} {'max MI, бит':>12s} {'время, с':>9s}  вывод")
+    for path in paths:
+        dataset = open_dataset(path)
+        for group_size in args.group_size:
+            start = time.perf_counter()
+            result = screen_dataset(dataset, group_size, args.alpha, args.max_samples)
+            elapsed = time.perf_counter() - start
+            verdict = "обучать" if result['worth_training'] else "пропустить"
+            print(f"{dataset_name(path):36s} {group_size:6d} {result['samples']:10d} "
+                  f"{len(result['flagged_bits']):5d} {result['max_mutual_information']:12.3e} {elapsed:9.2f}  {verdict}")
+            if result['flagged_bits']:
+                print(f"  значимые биты ключа: {result['flagged_bits']}")
+            results.append(dict(result, dataset=path, seconds=elapsed))
+            if args.csv_dir:
+                os.makedirs(args.csv_dir, exist_ok=True)
+                with open(os.path.join(args.csv_dir, f"screen_{dataset_name(path)}_g{group_size}.csv"), 'w',
+                          newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(['bit'] + list(result['bits']))
+                    for bit in range(result['key_bits']):
+                        writer.writerow([bit] + [values[bit].item() for values in result['bits'].values()])
+
+    worth = sorted({dataset_name(r['dataset']) for r in results if r['worth_training']})
+    print(f"\nКонфигурации для train_model.py: {', '.join(worth) if worth else 'нет'}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump([dict(r, bits={name: values.tolist() for name, values in r['bits'].items()})
+                       for r in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
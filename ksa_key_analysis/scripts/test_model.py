@@ -1,7 +1,12 @@
 import argparse
+import os
 import sys
-import numpy as np
-from tensorflow.keras.models import load_model
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.generation import make_spec, open_round_dataset, parse_rounds
+from utils import profiling
+from utils.stats import CI_METHODS
+from models.config import EVAL_BATCH_SIZE, model_path
+from models.pipeline import evaluate_ksa_model, load_ksa_model, print_report, save_results
 
 def main():
     parser = argparse.ArgumentParser()
@@ -11,74 +16,48 @@ def main():
     parser.add_argument('--train_samples', type=int, default=100000, help='Примеров для обучения')
     parser.add_argument('--key_size', type=int)
     parser.add_argument('--test_samples', type=int, default=40000, help='Примеров для теста')
+    parser.add_argument('--results_dir', type=str, default='results', help='Каталог модели и результатов')
+    parser.add_argument('--batch_size', type=int, default=EVAL_BATCH_SIZE, help='Примеров в батче оценки')
+    parser.add_argument('--ci', type=str, default='wilson', choices=CI_METHODS, help='Метод доверительных интервалов')
+    parser.add_argument('--confidence', type=float, default=0.95, help='Уровень доверия интервалов')
+    parser.add_argument('--sboxes', type=int, default=1, choices=[1, 2, 3, 4, 5], help='Число S-box в АРК (только для PRESENT)')
+    parser.add_argument('--trajectory', nargs='+', help='Раунды датасета-траектории (например, 1-10), из которого берутся ключи раунда --rounds')
+    parser.add_argument('--profile', action='store_true', help='Время и пиковая память этапов, трасса JSON в каталоге результатов')
     args = parser.parse_args()
     
-    if args.cipher == 'PRESENT':
-        predict_bits = 80
-        if args.key_size is None:
-            args.key_size = 80
-    elif args.cipher == 'GIFT':
-        predict_bits = 128
-        if args.key_size is None:
-            args.key_size = 128
-    else:
-        if args.key_size is None:
-            raise ValueError("Для SIMON и SPECK и RECTANGLE необходимо указать --key_size")
-        predict_bits = args.key_size
+    # Размер ключа PRESENT (80) и GIFT (128) фиксирован
+    if args.cipher not in ('PRESENT', 'GIFT') and args.key_size is None:
+        raise ValueError("Для SIMON и SPECK и RECTANGLE необходимо указать --key_size")
     
-    try:
-        if args.cipher == 'PRESENT':
-            data_file = f"data/present_{args.block_size}_80_{args.rounds}_keys.npz"
-        elif args.cipher == 'GIFT':
-            data_file = f"data/gift_{args.block_size}_128_{args.rounds}_keys.npz"
-        else:
-            data_file = f"data/{args.cipher.lower()}_{args.block_size}_{args.key_size}_{args.rounds}_keys.npz" 
-     
-        # Загрузка данных
-        data = np.load(data_file, allow_pickle=True)
-        keys_bits = data["keys"][args.train_samples:args.train_samples+args.test_samples] #   Тестовая выборка (последние 40k)
-        last_round_keys = data["last_round_keys"][args.train_samples:args.train_samples+args.test_samples]
-
-        model_file = f"results/{args.cipher.lower()}_{args.block_size}_{args.rounds}"
-        if args.cipher == 'PRESENT':
-            model_file += ".weights.h5"
-        elif args.cipher == 'GIFT':
-            model_file += ".weights.h5"
-        else:
-            model_file += f"_{args.key_size}.weights.h5"
-        
-    # Загрузка модели
-        model = load_model(model_file)
+    spec = make_spec(args.cipher, args.block_size, args.rounds, args.key_size, args.sboxes)
+    profiler = profiling.start(f"test_{spec.cipher.lower()}_{spec.block_size}_{spec.key_size}_{spec.rounds}", args.profile)
 
-        # Предсказание
-        predictions = model.predict(last_round_keys)
-        predicted_bits = np.zeros((len(last_round_keys), predict_bits), dtype=np.uint8)
+    try:
+        # Загрузка данных (.packed или .npz, или раунд датасета-траектории); примеры читаются и распаковываются по батчам
+        dataset = open_round_dataset(spec, parse_rounds(args.trajectory or []))
+        test_end = args.train_samples + args.test_samples #   Тестовая выборка (последние 40k)
 
-        for i in range(predict_bits):
-            predicted_bits[:, i] = np.argmax(predictions[i], axis=1)
+        # Наличие модели проверяется до загрузки TensorFlow
+        if not os.path.exists(model_path(spec, args.results_dir)):
+            raise FileNotFoundError(f"Модель {model_path(spec, args.results_dir)} не найдена")
 
-        # Расчет точности
-        bit_accuracies = []
-        print("\nТочность по битам:")
-        for bit in range(predict_bits):
-            acc = np.mean(predicted_bits[:, bit] == keys_bits[:, bit])
-            bit_accuracies.append(acc)
-            print(f"Bit {bit:3d}: {acc:.2%}")
+    # Загрузка модели (только для предсказания, любой вариант выходного слоя)
+        model = load_ksa_model(spec, args.results_dir)
 
-        avg_accuracy = np.mean(bit_accuracies)
-        print(f"\nСредняя точность: {avg_accuracy:.2%}")
+        # Предсказание и расчет точности по батчам (вероятности целиком не хранятся)
+        report = evaluate_ksa_model(model, dataset, spec, args.train_samples, test_end,
+                                    args.batch_size, args.confidence, args.ci)
+        print_report(report)
 
-        result_file = f"results/test_results_{args.cipher}_{predict_bits}bit_{args.rounds}r.txt"
         # Сохранение результатов
-        with open(result_file, "w") as f:
-            f.write(f"Конфигурация: {args.cipher}_{args.block_size}/{args.key_size}/{args.rounds}r\n")
-            f.write(f"Средняя точность: {avg_accuracy * 100:.2f}%\n")
-            f.write("Точность по битам:\n")
-            for bit in range(predict_bits):
-                f.write(f"Bit {bit:3d}: {bit_accuracies[bit]:.2%}\n")
-                
+        save_results(report, spec, args.results_dir,
+                     train_samples=args.train_samples, test_samples=args.test_samples)
+
     except Exception as e:
         print(f"Ошибка при тестировании: {str(e)}")
         sys.exit(1)
+    finally:
+        # Трасса сохраняется и при ошибке
+        profiler.finish(args.results_dir)
 if __name__ == "__main__":
     main()
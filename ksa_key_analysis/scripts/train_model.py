@@ -2,35 +2,31 @@ import argparse
 import os
 import sys
 import numpy as np
-from tensorflow.keras.callbacks import EarlyStopping
-from tensorflow.keras.utils import to_categorical
-from tensorflow.keras.models import load_model
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.generation import SHARD_SIZE, KeyStream, generate_dataset, make_spec, open_round_dataset, parse_rounds
+from utils import profiling
+from models.config import HEADS, SHUFFLE_BUFFER
+from models.pipeline import build_model, fit_model, save_model, train_ksa_model
 
 CIPHER_CONFIG = {
     'PRESENT': {
         'key_bits': 80,
-        'model_builder': 'build_ksa_model',
         'require_key_size': False
     },
     'SIMON': {
         'key_bits': lambda args: args.key_size,
-        'model_builder': 'build_simon_ksa_model',
         'require_key_size': True
     },
     'SPECK': {
         'key_bits': lambda args: args.key_size,
-        'model_builder': 'build_speck_ksa_model',
         'require_key_size': True
     },
     'GIFT': {
         'key_bits': 128,
-        'model_builder': 'build_gift_ksa_model',
         'require_key_size': False
     },
     'RECTANGLE': {
         'key_bits': lambda args: args.key_size,
-        'model_builder': 'build_rectangle_ksa_model',
         'require_key_size': True
     }
 }
@@ -54,6 +50,40 @@ def main():
                       help='Примеров для обучения')
     parser.add_argument('--test_samples', type=int, default=40000,
                       help='Примеров для теста')
+    parser.add_argument('--sboxes', type=int, default=1, choices=[1, 2, 3, 4, 5],
+                      help='Число S-box в АРК (только для PRESENT)')
+    parser.add_argument('--shuffle_buffer', type=int, default=SHUFFLE_BUFFER,
+                      help='Размер буфера перемешивания (примеров)')
+    parser.add_argument('--results_dir', type=str, default='results',
+                      help='Каталог для сохранения модели')
+    parser.add_argument('--head', type=str, default='per_bit', choices=HEADS,
+                      help='Выходной слой: per_bit - Dense(2, softmax) на каждый бит, multilabel - один Dense(key_bits, sigmoid)')
+    parser.add_argument('--fast', action='store_true',
+                      help='Быстрый режим CPU: XLA (jit_compile) и несколько шагов за вызов')
+    parser.add_argument('--steps_per_execution', type=int,
+                      help='Шагов обучения за вызов в режиме --fast')
+    parser.add_argument('--intra_op_threads', type=int,
+                      help='Потоков TensorFlow внутри операции')
+    parser.add_argument('--inter_op_threads', type=int,
+                      help='Параллельных операций TensorFlow')
+    parser.add_argument('--bf16', action='store_true',
+                      help='Смешанная точность bfloat16 (если поддерживается процессором)')
+    parser.add_argument('--online', action='store_true',
+                      help='Обучение на потоке свежих примеров без датасета на диске')
+    parser.add_argument('--steps_per_epoch', type=int,
+                      help='Шагов за эпоху в режиме --online (по умолчанию train_samples / batch_size)')
+    parser.add_argument('--producers', type=int, default=max(1, (os.cpu_count() or 1) - 1),
+                      help='Число процессов-генераторов в режиме --online')
+    parser.add_argument('--queue_size', type=int, default=4,
+                      help='Длина очереди готовых шардов в режиме --online')
+    parser.add_argument('--seed', type=int,
+                      help='Seed потока примеров в режиме --online (по умолчанию случайный)')
+    parser.add_argument('--trajectory', nargs='+',
+                      help='Раунды датасета-траектории (например, 1-10), из которого берутся ключи раунда --rounds')
+    parser.add_argument('--profile', action='store_true',
+                      help='Время и пиковая память этапов, трасса JSON в каталоге результатов')
+    parser.add_argument('--tf_profile_steps', type=int, nargs=2, metavar=('START', 'STOP'),
+                      help='Профилировщик TensorFlow на шагах обучения [START, STOP) (results_dir/tf_profile)')
     args = parser.parse_args()
     
     config = CIPHER_CONFIG[args.cipher]
@@ -61,64 +91,65 @@ def main():
     # Проверка параметров
     if config['require_key_size'] and not args.key_size:
         parser.error(f"Для {args.cipher} требуется --key_size")
+    if args.online and args.trajectory:
+        parser.error("--trajectory не используется с --online")
 
     # Определение количества бит ключа
     key_bits = config['key_bits'](args) if callable(config['key_bits']) else config['key_bits']
+    spec = make_spec(args.cipher, args.block_size, args.rounds, key_bits, args.sboxes)
+    profiler = profiling.start(f"train_{spec.cipher.lower()}_{spec.block_size}_{spec.key_size}_{spec.rounds}", args.profile)
 
-    # Унифицированные имена файлов
-    data_file = f"data/{args.cipher.lower()}_{args.block_size}_{key_bits}_{args.rounds}_keys.npz"
-
-
-    model_file = f"results/{args.cipher.lower()}_{args.block_size}_{args.rounds}"
-    if args.cipher in ['SIMON', 'SPECK', 'RECTANGLE']:
-        model_file += f"_{args.key_size}.weights.h5"
-    else:
-            model_file += ".weights.h5"
-
+    stream = None
     try:
-        # Загрузка данных
-        data = np.load(data_file, allow_pickle=True)
-        keys_bits = data["keys"]
-        last_round_keys = data["last_round_keys"]
-
-        # Разделение данных
-        X_train = last_round_keys[:args.train_samples]
-        X_test = last_round_keys[args.train_samples:args.train_samples+args.test_samples]
-        y_train = keys_bits[:args.train_samples]
-        y_test = keys_bits[args.train_samples:args.train_samples+args.test_samples]
+        # Данные готовятся до загрузки TensorFlow: ошибки выявляются сразу,
+        # а процессы-производители запускаются из процесса без его потоков
+        if args.online:
+            # Поток - тот же детерминированный датасет, что и при генерации с данным seed:
+            # первые test_samples примеров - отложенная выборка, обучение идет на шардах после нее
+            entropy = np.random.SeedSequence(args.seed).entropy
+            print(f"Онлайн-обучение, seed потока: {entropy}")
+            with profiling.span('generate_validation', samples=args.test_samples):
+                val_keys, val_round_keys, _ = generate_dataset(spec, args.test_samples, args.producers, entropy)
+            stream = KeyStream(spec, entropy, first_shard=-(-args.test_samples // SHARD_SIZE),
+                               producers=args.producers, queue_size=args.queue_size)
+        else:
+            # Датасет .packed или .npz (или раунд датасета-траектории);
+            # tf.data читает батчи из файла по мере обучения
+            dataset = open_round_dataset(spec, parse_rounds(args.trajectory or []))
 
-        # One-hot кодирование
-        y_train_onehot = [to_categorical(y_train[:, i], num_classes=2) for i in range(key_bits)]
-        y_test_onehot = [to_categorical(y_test[:, i], num_classes=2) for i in range(key_bits)]
+        with profiling.span('import_tensorflow'):
+            from models.training import ProfilerWindow, configure_cpu, fast_compile_kwargs
+        configure_cpu(args.intra_op_threads, args.inter_op_threads, args.bf16)
+        compile_kwargs = fast_compile_kwargs(args.steps_per_execution) if args.fast else {}
+        callbacks = []
+        if args.tf_profile_steps:
+            callbacks.append(ProfilerWindow(os.path.join(args.results_dir, 'tf_profile'), *args.tf_profile_steps))
 
-        # Динамический импорт и построение модели
-        module = __import__(f'models.ksa_model', fromlist=[config['model_builder']])
-        model_builder = getattr(module, config['model_builder'])
-        
-        if args.cipher in ['SIMON', 'SPECK', 'RECTANGLE']:
-            model = model_builder(args.block_size, args.key_size)
+        if args.online:
+            from models.input_pipeline import make_array_dataset, make_stream_dataset
+            train_data = make_stream_dataset(stream, args.batch_size, key_bits, val_round_keys.shape[1], args.head)
+            test_data = make_array_dataset(val_keys, val_round_keys, args.batch_size, key_bits, args.head)
+            model = build_model(spec, args.head, **compile_kwargs)
+            fit_model(model, train_data, test_data, args.epochs, args.batch_size,
+                      steps_per_epoch=args.steps_per_epoch or max(1, args.train_samples // args.batch_size),
+                      callbacks=callbacks)
         else:
-            model = model_builder(args.block_size)
-
-        # Обучение модели
-        model.fit(
-            X_train,
-            y_train_onehot,
-            validation_data=(X_test, y_test_onehot),
-            epochs=args.epochs,
-            batch_size=args.batch_size,
-            callbacks=[EarlyStopping(monitor='val_accuracy', patience=10, restore_best_weights=True)],
-            verbose=2
-        )
+            model = train_ksa_model(spec, dataset, args.train_samples, args.test_samples, args.epochs,
+                                    args.batch_size, args.head, args.shuffle_buffer, callbacks=callbacks,
+                                    **compile_kwargs)
 
         # Сохранение модели
-        os.makedirs("results", exist_ok=True)
-        model.save(model_file)
+        model_file = save_model(model, spec, args.results_dir)
         print(f"Модель сохранена в {model_file}")
 
     except Exception as e:
         print(f"Ошибка: {str(e)}")
         sys.exit(1)
+    finally:
+        if stream is not None:
+            stream.close()
+        # Трасса сохраняется и при ошибке: именно такие запуски нужно разбирать
+        profiler.finish(args.results_dir)
         
 if __name__ == "__main__":
     main()
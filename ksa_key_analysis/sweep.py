@@ -0,0 +1,298 @@
+import csv
+import itertools
+import json
+import os
+import subprocess
+import sys
+from argparse import ArgumentParser
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.generation import FIXED_KEY_SIZES, format_rounds, parse_rounds
+from utils.linear import LINEAR_CIPHERS
+from models.config import model_path, report_path
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+CIPHERS = ('PRESENT', 'SIMON', 'SPECK', 'GIFT', 'RECTANGLE')
+
+# Переменные окружения, ограничивающие число потоков процессов задания
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                   'TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS')
+
+Job = namedtuple('Job', ['cipher', 'block_size', 'key_size', 'rounds', 'sboxes', 'train_samples', 'test_samples'])
+
+SUMMARY_FIELDS = list(Job._fields) + ['status', 'mean_accuracy', 'significant_bits', 'significant_bits_bonferroni']
+
+
+def parse_config(cipher, config):
+    """Конфигурация "блок/ключ" (или "блок" для PRESENT и GIFT) -> (block_size, key_size)."""
+    parts = str(config).split('/')
+    block_size = int(parts[0])
+    key_size = int(parts[1]) if len(parts) > 1 else FIXED_KEY_SIZES.get(cipher)
+    if key_size is None:
+        raise ValueError(f"Для {cipher} конфигурация задается как блок/ключ: {config}")
+    if cipher in FIXED_KEY_SIZES and key_size != FIXED_KEY_SIZES[cipher]:
+        raise ValueError(f"Размер ключа {cipher} - {FIXED_KEY_SIZES[cipher]} бит: {config}")
+    return block_size, key_size
+
+
+def expand_grid(grid):
+    """
+    Декартово произведение значений сетки -> список заданий (без повторов).
+    :param grid: словарь cipher, config, rounds, sboxes, train_samples, test_samples -> список значений
+                 или список таких словарей (например, для разных шифров)
+    """
+    if isinstance(grid, list):
+        return list(dict.fromkeys(job for part in grid for job in expand_grid(part)))
+    for name in ('cipher', 'config', 'rounds'):
+        if name not in grid:
+            raise ValueError(f"Не задан параметр сетки: {name}")
+    jobs = []
+    for cipher, config, rounds, sboxes, train_samples, test_samples in itertools.product(
+            grid['cipher'], grid['config'], parse_rounds(grid['rounds']), grid.get('sboxes', [1]),
+            grid.get('train_samples', [100000]), grid.get('test_samples', [40000])):
+        if cipher not in CIPHERS:
+            raise ValueError(f"Unsupported cipher: {cipher}")
+        block_size, key_size = parse_config(cipher, config)
+        # Число S-box - параметр только PRESENT
+        job = Job(cipher, block_size, key_size, rounds, sboxes if cipher == 'PRESENT' else 1,
+                  train_samples, test_samples)
+        if job not in jobs:
+            jobs.append(job)
+    return jobs
+
+
+def job_name(job):
+    suffix = f"_s{job.sboxes}" if job.sboxes != 1 else ""
+    return (f"{job.cipher.lower()}_{job.block_size}_{job.key_size}_{job.rounds}{suffix}"
+            f"_n{job.train_samples}_{job.test_samples}")
+
+
+def report_json(job, results_dir):
+    """JSON-отчет тестирования задания (имена файлов - см. models.config)."""
+    return os.path.splitext(report_path(job, results_dir))[0] + ".json"
+
+
+def option_flags(options):
+    """Словарь параметров -> аргументы командной строки (True - флаг без значения)."""
+    flags = []
+    for name, value in options.items():
+        if value is None or value is False:
+            continue
+        flags.append(f"--{name}")
+        if value is not True:
+            flags.append(str(value))
+    return flags
+
+
+def is_algebraic(job, settings):
+    """Задание выполняется точным анализом над GF(2) (линейный АРК в режиме algebraic)."""
+    return settings['algebraic'] and job.cipher in LINEAR_CIPHERS
+
+
+def job_commands(job, settings, results_dir, trajectory=None):
+    """
+    Команды этапов задания: [(этап, аргументы, признак готовности)].
+    :param trajectory: раунды общего датасета-траектории (None - отдельный датасет задания)
+    """
+    common = ['--block_size', str(job.block_size)]
+    if job.cipher in ('SIMON', 'SPECK', 'RECTANGLE'):
+        common += ['--key_size', str(job.key_size)]
+    if job.cipher == 'PRESENT':
+        common += ['--sboxes', str(job.sboxes)]
+    rounds = ['--rounds', str(job.rounds)]
+    if is_algebraic(job, settings):
+        # Линейный АРК: точный анализ над GF(2) вместо генерации, обучения и тестирования
+        return [('analyze', ['scripts/analyze_linear.py', '--cipher', job.cipher] + common + rounds
+                 + ['--results_dir', results_dir], report_json(job, results_dir))]
+    if trajectory:
+        data_rounds = ['--trajectory'] + format_rounds(trajectory).split('.')
+        rounds += data_rounds
+    else:
+        data_rounds = rounds
+    samples = ['--train_samples', str(job.train_samples), '--test_samples', str(job.test_samples)]
+    generate = dict({'workers': settings['threads']}, **settings['generate'])
+    return [
+        # Генерация идемпотентна: существующий датасет берется из реестра или дополняется
+        ('generate', [f'scripts/generate_data_{job.cipher.lower()}.py'] + common + data_rounds
+         + ['--num_samples', str(job.train_samples + job.test_samples)] + option_flags(generate),
+         None),
+        ('train', ['scripts/train_model.py', '--cipher', job.cipher] + common + rounds + samples
+         + ['--results_dir', results_dir] + option_flags(settings['train']),
+         model_path(job, results_dir)),
+        ('test', ['scripts/test_model.py', '--cipher', job.cipher] + common + rounds + samples
+         + ['--results_dir', results_dir] + option_flags(settings['test']),
+         report_json(job, results_dir)),
+    ]
+
+
+def run_job(job, settings, trajectory=None, stages=None):
+    """
+    Выполнение этапов задания в отдельных процессах с ограничением числа потоков.
+    Этапы, результат которых уже есть (модель, отчет), пропускаются.
+    :param stages: выполняемые этапы (None - все)
+    :return: статус задания
+    """
+    results_dir = os.path.join(settings['output'], job_name(job))
+    if os.path.exists(report_json(job, results_dir)):
+        return 'skipped'
+    os.makedirs(results_dir, exist_ok=True)
+    env = dict(os.environ, **{name: str(settings['threads']) for name in THREAD_ENV_VARS})
+    with open(os.path.join(results_dir, "sweep.log"), "a") as log:
+        for stage, args, done_file in job_commands(job, settings, results_dir, trajectory):
+            if stages is not None and stage not in stages:
+                continue
+            if done_file is not None and os.path.exists(done_file):
+                continue
+            log.write(f"$ {' '.join(args)}\n")
+            log.flush()
+            result = subprocess.run([sys.executable] + args, cwd=ROOT, env=env,
+                                    stdout=log, stderr=subprocess.STDOUT)
+            if result.returncode != 0:
+                return f"failed: {stage}"
+    return 'done'
+
+
+def run_and_print(job, settings, trajectory=None, stages=None):
+    status = run_job(job, settings, trajectory, stages)
+    print(f"{job_name(job)}: {status}", flush=True)
+    return job, status
+
+
+def run_group(jobs, settings):
+    """
+    Задания с общим файлом датасета выполняются последовательно: первым - с наибольшим
+    числом примеров, остальные используют его датасет повторно.
+    """
+    return [run_and_print(job, settings)
+            for job in sorted(jobs, key=lambda job: -(job.train_samples + job.test_samples))]
+
+
+def generate_trajectory(jobs, settings):
+    """
+    Однократная генерация датасета-траектории всех раундов заданий jobs одной конфигурации
+    (с наибольшим числом примеров среди незавершенных заданий).
+    :return: (раунды траектории, статус генерации)
+    """
+    trajectory = sorted({job.rounds for job in jobs})
+    pending = [job for job in jobs
+               if not os.path.exists(report_json(job, os.path.join(settings['output'], job_name(job))))]
+    if not pending:
+        return trajectory, 'skipped'
+    job = max(pending, key=lambda job: job.train_samples + job.test_samples)
+    return trajectory, run_job(job, settings, trajectory, stages=('generate',))
+
+
+def write_summary(statuses, settings):
+    """Сводная таблица по всем заданиям сетки (по JSON-отчетам тестирования)."""
+    path = os.path.join(settings['output'], "summary.csv")
+    with open(path, "w", newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        for job, status in statuses:
+            row = dict(job._asdict(), status=status)
+            report_file = report_json(job, os.path.join(settings['output'], job_name(job)))
+            if os.path.exists(report_file):
+                with open(report_file) as report:
+                    report = json.load(report)
+                row.update({name: report[name] for name in SUMMARY_FIELDS[len(Job._fields) + 1:]})
+            writer.writerow(row)
+    return path
+
+
+def run_sweep(jobs, settings):
+    """
+    Выполнение заданий в пуле из settings['jobs'] параллельных заданий. В режиме trajectory
+    датасет-траектория каждой конфигурации генерируется один раз, после чего обучение
+    и тестирование ее раундов выполняются в пуле как независимые задания. Задания точного
+    анализа над GF(2) не используют датасет и всегда выполняются отдельно.
+    """
+    groups = {}
+    trajectories = {}
+    for job in jobs:
+        # Группа - задания с общим датасетом (в режиме trajectory - все раунды конфигурации)
+        key = (job.cipher, job.block_size, job.key_size, job.sboxes)
+        if settings['trajectory'] and not is_algebraic(job, settings):
+            trajectories.setdefault(key, []).append(job)
+        else:
+            groups.setdefault(key + (job.rounds,), []).append(job)
+    statuses = []
+    with ThreadPoolExecutor(max_workers=settings['jobs']) as pool:
+        group_futures = [pool.submit(run_group, group, settings) for group in groups.values()]
+        generations = {pool.submit(generate_trajectory, group, settings): group
+                       for group in trajectories.values()}
+        futures = []
+        for future in as_completed(generations):
+            trajectory, status = future.result()
+            if status.startswith('failed'):
+                for job in generations[future]:
+                    statuses.append((job, status))
+                    print(f"{job_name(job)}: {status}", flush=True)
+                continue
+            futures += [pool.submit(run_and_print, job, settings, trajectory, ('train', 'test'))
+                        for job in generations[future]]
+        for future in as_completed(group_futures):
+            statuses.extend(future.result())
+        statuses.extend(future.result() for future in as_completed(futures))
+    statuses.sort(key=lambda item: jobs.index(item[0]))
+    return write_summary(statuses, settings)
+
+
+def load_settings(args):
+    """Сетка и параметры этапов из файла --config_file, переопределенные аргументами CLI."""
+    settings = {'grid': {}, 'generate': {}, 'train': {}, 'test': {},
+                'jobs': 1, 'threads': 1, 'trajectory': False, 'algebraic': False,
+                'output': os.path.join('results', 'sweep')}
+    if args.config_file:
+        with open(args.config_file) as f:
+            config = json.load(f)
+        for name, value in config.items():
+            if name not in settings:
+                raise ValueError(f"Неизвестный раздел файла сетки: {name}")
+            settings[name] = value
+    grid_args = {name: getattr(args, name) for name in ('cipher', 'config', 'rounds', 'sboxes',
+                                                         'train_samples', 'test_samples')
+                 if getattr(args, name) is not None}
+    if grid_args:
+        grids = settings['grid'] if isinstance(settings['grid'], list) else [settings['grid']]
+        settings['grid'] = [dict(grid, **grid_args) for grid in grids]
+    for name in ('jobs', 'threads', 'trajectory', 'algebraic', 'output'):
+        if getattr(args, name) is not None:
+            settings[name] = getattr(args, name)
+    settings['output'] = os.path.abspath(settings['output'])
+    return settings
+
+
+def parse_args():
+    parser = ArgumentParser(description='Серия экспериментов по сетке конфигураций (без интерактивного ввода)')
+    parser.add_argument('--config_file', type=str,
+                      help='JSON: grid (значения параметров или список сеток), generate/train/test (аргументы скриптов), '
+                           'jobs, threads, trajectory, algebraic, output')
+    parser.add_argument('--cipher', nargs='+', choices=CIPHERS, help='Шифры')
+    parser.add_argument('--config', nargs='+',
+                      help='Конфигурации: блок/ключ (например, 32/64) или блок для PRESENT и GIFT')
+    parser.add_argument('--rounds', nargs='+', help='Числа раундов или диапазоны (например, 2-5)')
+    parser.add_argument('--sboxes', nargs='+', type=int, help='Число S-box в АРК (только для PRESENT)')
+    parser.add_argument('--train_samples', nargs='+', type=int, help='Примеров для обучения')
+    parser.add_argument('--test_samples', nargs='+', type=int, help='Примеров для теста')
+    parser.add_argument('--jobs', type=int, help='Число параллельно выполняемых заданий')
+    parser.add_argument('--threads', type=int, help='Потоков на задание (генерация, TensorFlow, BLAS)')
+    parser.add_argument('--trajectory', action='store_true', default=None,
+                      help='Один датасет-траектория на конфигурацию для всех ее раундов')
+    parser.add_argument('--algebraic', action='store_true', default=None,
+                      help='Для GIFT и SIMON - точный анализ над GF(2) (scripts/analyze_linear.py) вместо обучения')
+    parser.add_argument('--output', type=str, help='Каталог результатов серии (по умолчанию results/sweep)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    settings = load_settings(args)
+    jobs = expand_grid(settings['grid'])
+    print(f"Заданий: {len(jobs)}, параллельно: {settings['jobs']}, потоков на задание: {settings['threads']}")
+    summary = run_sweep(jobs, settings)
+    print(f"Сводка сохранена в {summary}")
+
+
+if __name__ == "__main__":
+    main()
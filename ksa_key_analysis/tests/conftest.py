@@ -0,0 +1,39 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+import pytest
+from utils.bitcodec import key_bits_to_ints
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Рабочий каталог теста: data/ (датасеты, реестр, кэш АРК) создается внутри tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def scalar_round_keys(instance, key_bits, rounds, width):
+    """
+    Раундовые ключи скалярной (эталонной) реализации generate_round_keys в порядке бит
+    пакетных движков: массив (N, число ключей, width), бит j ключа - столбец j.
+    """
+    return np.array([[[(round_key >> j) & 1 for j in range(width)]
+                      for round_key in instance.generate_round_keys(key, rounds)]
+                     for key in key_bits_to_ints(key_bits)], dtype=np.uint8)
+
+
+@pytest.fixture
+def check_batch_schedule():
+    """
+    Проверка generate_round_keys_batch экземпляра шифра против generate_round_keys:
+    последний ключ и (all_rounds=True) все ключи на случайных мастер-ключах.
+    """
+    def check(instance, key_size, rounds, num_keys=16, seed=0):
+        from utils.bitcodec import sample_keys
+        key_bits = sample_keys(num_keys, key_size, np.random.default_rng(seed))
+        last = instance.generate_round_keys_batch(key_bits, rounds)
+        expected = scalar_round_keys(instance, key_bits, rounds, last.shape[1])
+        np.testing.assert_array_equal(last, expected[:, -1])
+        np.testing.assert_array_equal(instance.generate_round_keys_batch(key_bits, rounds, all_rounds=True), expected)
+    return check
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from utils.bitcodec import (bits_to_words, key_bits_to_ints, pack_key_bits, pack_round_key_bits, sample_keys,
+                            unpack_key_bits, unpack_round_key_bits, words_to_bits)
+
+
+@pytest.mark.parametrize('key_size', [64, 72, 80, 128, 144, 256])
+def test_sample_keys_prefix(key_size):
+    small = sample_keys(10, key_size, np.random.default_rng(5))
+    large = sample_keys(100, key_size, np.random.default_rng(5))
+    assert small.shape == (10, key_size) and small.dtype == np.uint8
+    np.testing.assert_array_equal(small, large[:10])
+
+
+@pytest.mark.parametrize('num_bits', [8, 20, 72, 80])
+def test_pack_round_trip(num_bits):
+    bits = np.random.default_rng(0).integers(0, 2, (50, num_bits), dtype=np.uint8)
+    np.testing.assert_array_equal(unpack_key_bits(pack_key_bits(bits), num_bits), bits)
+    np.testing.assert_array_equal(unpack_round_key_bits(pack_round_key_bits(bits), num_bits), bits)
+
+
+def test_key_bits_to_ints_msb_first():
+    key_bits = sample_keys(20, 80, np.random.default_rng(1))
+    assert key_bits_to_ints(key_bits) == [int(''.join(map(str, row)), 2) for row in key_bits]
+
+
+@pytest.mark.parametrize('key_size, word_size', [(64, 16), (72, 24), (96, 48), (256, 64)])
+def test_words(key_size, word_size):
+    key_bits = sample_keys(20, key_size, np.random.default_rng(2))
+    words = bits_to_words(key_bits, word_size)
+    for row, key in zip(words, key_bits_to_ints(key_bits)):
+        assert [int(w) for w in row] == [(key >> (i * word_size)) & ((1 << word_size) - 1)
+                                         for i in range(key_size // word_size)]
+    # words_to_bits - младший бит первым: обратное к bits_to_words с переворотом столбцов
+    np.testing.assert_array_equal(words_to_bits(words, word_size).reshape(20, key_size)[:, ::-1], key_bits)
+
+
+def test_words_reject_bad_size():
+    with pytest.raises(ValueError):
+        bits_to_words(np.zeros((1, 72), dtype=np.uint8), 32)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from utils.generation import SHARD_SIZE, KeyStream, generate_dataset, iter_range, make_spec
+
+SPEC = make_spec('SPECK', 32, 4, 64)
+
+
+def test_result_does_not_depend_on_workers():
+    single = generate_dataset(SPEC, SHARD_SIZE + 1000, workers=1, seed=3)
+    parallel = generate_dataset(SPEC, SHARD_SIZE + 1000, workers=2, seed=3)
+    for a, b in zip(single, parallel):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_smaller_dataset_is_prefix():
+    keys, round_keys, entropy = generate_dataset(SPEC, SHARD_SIZE + 1000, seed=4)
+    small_keys, small_round_keys, small_entropy = generate_dataset(SPEC, 1000, seed=4)
+    assert entropy == small_entropy == 4
+    np.testing.assert_array_equal(small_keys, keys[:1000])
+    np.testing.assert_array_equal(small_round_keys, round_keys[:1000])
+
+
+@pytest.mark.parametrize('start, stop', [(0, 10), (500, SHARD_SIZE + 700), (SHARD_SIZE, SHARD_SIZE + 1)])
+def test_iter_range_matches_full_dataset(start, stop):
+    keys, round_keys, entropy = generate_dataset(SPEC, stop, seed=5)
+    chunks = list(iter_range(SPEC, entropy, start, stop))
+    np.testing.assert_array_equal(np.concatenate([k for k, _ in chunks]), keys[start:])
+    np.testing.assert_array_equal(np.concatenate([r for _, r in chunks]), round_keys[start:])
+
+
+def test_make_spec():
+    assert make_spec('GIFT', 64, 5, key_size=99).key_size == 128
+    assert make_spec('SIMON', 32, 5, 64, sboxes=3).sboxes == 1
+    with pytest.raises(ValueError):
+        make_spec('SIMON', 32, 5)
+
+
+def test_key_stream_matches_dataset_shards():
+    keys, round_keys, entropy = generate_dataset(SPEC, 2 * SHARD_SIZE, seed=6)
+    with KeyStream(SPEC, entropy, first_shard=1) as stream:
+        shard_keys, shard_round_keys = next(iter(stream))
+    np.testing.assert_array_equal(shard_keys, keys[SHARD_SIZE:])
+    np.testing.assert_array_equal(shard_round_keys, round_keys[SHARD_SIZE:])
+
+
+def test_key_stream_fails_when_producer_dies():
+    with KeyStream(SPEC, 7, producers=2, queue_size=1, shard_size=100) as stream:
+        for process in stream.processes:
+            process.kill()
+            process.join()
+        with pytest.raises(RuntimeError, match="died"):
+            for _ in stream:
+                pass
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+
+from utils.linear import analyze_affine, gf2_rref, load_affine
+
+SCRIPT = os.path.join(os.path.dirname(__file__), '..', 'scripts', 'analyze_linear.py')
+
+
+def test_gf2_rref():
+    rng = np.random.default_rng(0)
+    basis = np.hstack([np.eye(5, dtype=np.uint8), rng.integers(0, 2, (5, 7), dtype=np.uint8)])
+    # Лишние строки - суммы строк базиса
+    combinations = rng.integers(0, 2, (9, 5)) @ basis % 2
+    matrix = rng.permutation(np.vstack([basis, combinations]))
+    rows, pivots = gf2_rref(matrix)
+    assert pivots.tolist() == [0, 1, 2, 3, 4]
+    np.testing.assert_array_equal(rows[:, pivots], np.eye(5, dtype=np.uint8))
+    np.testing.assert_array_equal(rows, basis)
+
+
+def test_analyze_simon_first_round(workdir):
+    """Первый раундовый ключ SIMON32/64 - старшее слово мастер-ключа."""
+    analysis = analyze_affine(load_affine('SIMON', 32, 64, 1))
+    assert analysis.rank == 16
+    assert analysis.kernel_dimension == 48
+    assert analysis.determined.sum() == 16
+    assert analysis.determined[:16].all()
+
+
+@pytest.mark.parametrize('rounds', [1, 5])
+def test_analyze_gift(workdir, rounds):
+    """Раундовый ключ GIFT64 - перестановка битов двух слов ключа: все его 32 бита определены."""
+    analysis = analyze_affine(load_affine('GIFT', 64, 128, rounds))
+    assert analysis.rank == 32
+    assert analysis.determined.sum() == 32
+    assert len(analysis.basis) == 32
+
+
+def test_analyze_linear_requires_key_size(workdir):
+    result = subprocess.run([sys.executable, SCRIPT, '--cipher', 'SIMON', '--block_size', '32', '--rounds', '2'],
+                            capture_output=True, text=True)
+    assert result.returncode == 2
+    assert '--key_size' in result.stderr
+    assert 'Traceback' not in result.stderr
@@ -0,0 +1,48 @@
+import os
+import numpy as np
+import pytest
+from utils.bitcodec import key_bits_to_ints, sample_keys
+from utils.gift import GiftCipher
+from utils.linear import AffineKeySchedule, compile_affine, load_affine
+from utils.simon import SimonCipher
+
+
+def scalar_last_round_keys(cipher, key_bits, rounds, width):
+    return np.array([[(cipher.generate_round_keys(key, rounds)[-1] >> j) & 1 for j in range(width)]
+                     for key in key_bits_to_ints(key_bits)], dtype=np.uint8)
+
+
+@pytest.mark.parametrize('cipher_name, block_size, key_size', [
+    ('GIFT', 64, 128), ('GIFT', 128, 128), ('SIMON', 32, 64), ('SIMON', 64, 96), ('SIMON', 128, 256),
+])
+def test_affine_map_matches_scalar(workdir, cipher_name, block_size, key_size):
+    if cipher_name == 'GIFT':
+        cipher = GiftCipher(block_size)
+    else:
+        cipher = SimonCipher(block_size, key_size)
+    key_bits = sample_keys(64, key_size, np.random.default_rng(1))
+    for rounds in (1, 2, 9, cipher.rounds):
+        schedule = load_affine(cipher_name, block_size, key_size, rounds)
+        np.testing.assert_array_equal(schedule.apply(key_bits),
+                                      scalar_last_round_keys(cipher, key_bits, rounds, schedule.out_bits))
+
+
+def test_cache_round_trip(workdir):
+    schedule = load_affine('SIMON', 48, 72, 5)
+    assert os.path.exists('data/linear/simon_48_72_5.npz')
+    cached = load_affine('SIMON', 48, 72, 5)
+    np.testing.assert_array_equal(cached.matrix, schedule.matrix)
+    np.testing.assert_array_equal(cached.constant, schedule.constant)
+
+
+def test_apply_is_affine():
+    rng = np.random.default_rng(2)
+    schedule = AffineKeySchedule(rng.integers(0, 2, (20, 32)), rng.integers(0, 2, 20))
+    key_bits = rng.integers(0, 2, (10, 32), dtype=np.uint8)
+    expected = (key_bits.astype(np.int64) @ schedule.matrix.T.astype(np.int64) + schedule.constant) % 2
+    np.testing.assert_array_equal(schedule.apply(key_bits), expected)
+
+
+def test_nonlinear_schedule_rejected():
+    with pytest.raises(ValueError):
+        compile_affine('SPECK', 32, 64, 5)
@@ -0,0 +1,60 @@
+import json
+import pytest
+
+from utils import profiling
+
+
+@pytest.fixture(autouse=True)
+def restore_profiler(monkeypatch):
+    """Активный профилировщик восстанавливается после теста."""
+    monkeypatch.setattr(profiling, '_active', profiling.active())
+
+
+def test_disabled_profiler(tmp_path):
+    profiler = profiling.start('disabled', enabled=False)
+    assert profiling.span('stage') is profiling._NULL_SPAN
+    with profiling.span('stage'):
+        pass
+    assert profiler.stages == {} and profiler.events == []
+    assert profiler.finish(str(tmp_path)) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spans_and_trace(tmp_path, capsys):
+    profiler = profiling.start('run')
+    for _ in range(3):
+        with profiling.span('generate', samples=10):
+            pass
+    with pytest.raises(RuntimeError):
+        with profiling.span('train'):
+            raise RuntimeError
+    # Интервал этапа, завершившегося исключением, тоже записывается
+    assert profiler.stages['generate']['count'] == 3
+    assert profiler.stages['train']['count'] == 1
+    event = profiler.events[0]
+    assert event['stage'] == 'generate' and event['samples'] == 10
+    if profiling.current_rss_mb() is not None:
+        assert event['rss_start_mb'] > 0 and event['rss_end_mb'] > 0
+        assert 'max_rss_growth_mb' in profiler.stages['generate']
+    if profiling.peak_rss_mb() is not None:
+        assert event['peak_rss_mb'] > 0
+
+    path = profiler.finish(str(tmp_path))
+    assert path.startswith(str(tmp_path / 'trace_run_')) and path.endswith('.json')
+    with open(path) as f:
+        trace = json.load(f)
+    assert trace['run'] == 'run'
+    assert len(trace['events']) == 4 and trace['events_dropped'] == 0
+    assert "Трасса сохранена" in capsys.readouterr().out
+
+
+def test_events_limit(monkeypatch):
+    monkeypatch.setattr(profiling, 'MAX_EVENTS', 5)
+    profiler = profiling.Profiler('limit')
+    for i in range(8):
+        profiler.record('stage', i, i + 1)
+    # Сверх MAX_EVENTS события учитываются только в сводке
+    assert len(profiler.events) == 5
+    assert profiler.stages['stage']['count'] == 8
+    assert profiler.stages['stage']['seconds'] == pytest.approx(8)
+    assert profiler.trace()['events_dropped'] == 3
@@ -0,0 +1,14 @@
+import pytest
+from utils.rectangle import RectangleCipher
+
+
+@pytest.mark.parametrize('key_size', [80, 128])
+def test_batch_matches_scalar(check_batch_schedule, key_size):
+    cipher = RectangleCipher(64, key_size)
+    for rounds in (1, 2, 7, cipher.rounds):
+        check_batch_schedule(cipher, key_size, rounds, seed=rounds)
+
+
+def test_unsupported_key_size():
+    with pytest.raises(ValueError):
+        RectangleCipher(64, 96)
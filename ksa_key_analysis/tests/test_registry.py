@@ -0,0 +1,71 @@
+import os
+import numpy as np
+import pytest
+import utils.registry
+from utils.generation import ensure_dataset, generate_dataset, generate_to_file, iter_range, make_spec
+from utils.registry import DatasetRegistry
+from utils.storage import extend_dataset, open_dataset
+
+SPEC = make_spec('SIMON', 48, 6, 72)
+
+
+@pytest.mark.parametrize('ext', ['.npz', '.packed'])
+def test_extend_is_prefix_of_full_dataset(workdir, ext):
+    path = 'data/simon' + ext
+    entropy = generate_to_file(SPEC, 1000, path, seed=2)
+    assert extend_dataset(path, iter_range(SPEC, entropy, 1000, 70000)) == 70000
+    keys, round_keys, _ = generate_dataset(SPEC, 70000, seed=2)
+    dataset = open_dataset(path)
+    np.testing.assert_array_equal(dataset.keys(), keys)
+    np.testing.assert_array_equal(dataset.last_round_keys(), round_keys)
+
+
+@pytest.mark.parametrize('ext', ['.npz', '.packed'])
+def test_ensure_dataset_reuses_and_tops_up(workdir, ext):
+    path = 'data/simon' + ext
+    assert ensure_dataset(SPEC, 1000, path, seed=4) == (1000, 4)
+    assert ensure_dataset(SPEC, 500, path) == (1000, 4)
+    assert ensure_dataset(SPEC, 3000, path) == (3000, 4)
+    np.testing.assert_array_equal(open_dataset(path).keys(), generate_dataset(SPEC, 3000, seed=4)[0])
+    entry = DatasetRegistry().lookup(SPEC, path)
+    assert entry['num_samples'] == 3000 and entry['size'] == os.path.getsize(path)
+
+
+def test_other_seed_regenerates(workdir):
+    path = 'data/simon.packed'
+    ensure_dataset(SPEC, 1000, path, seed=4)
+    assert ensure_dataset(SPEC, 1000, path, seed=5) == (1000, 5)
+    np.testing.assert_array_equal(open_dataset(path).keys(), generate_dataset(SPEC, 1000, seed=5)[0])
+
+
+def test_checksum_only_when_file_changed(workdir, monkeypatch):
+    path = 'data/simon.packed'
+    ensure_dataset(SPEC, 1000, path, seed=4)
+    hashed = []
+    checksum = utils.registry.file_checksum
+    monkeypatch.setattr(utils.registry, 'file_checksum', lambda p: hashed.append(p) or checksum(p))
+
+    ensure_dataset(SPEC, 1000, path)
+    assert hashed == []
+    ensure_dataset(SPEC, 1000, path, verify=True)
+    assert len(hashed) == 1
+    # Новое время изменения при том же содержимом: один пересчет, затем снова быстрая проверка
+    os.utime(path, ns=(1, 1))
+    ensure_dataset(SPEC, 1000, path)
+    ensure_dataset(SPEC, 1000, path)
+    assert len(hashed) == 2
+
+
+def test_corrupted_file_regenerated(workdir):
+    path = 'data/simon.packed'
+    ensure_dataset(SPEC, 1000, path, seed=4)
+    with open(path, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)[0]
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last ^ 0xFF]))
+    os.utime(path, ns=(1, 1))
+    assert not DatasetRegistry().verify(DatasetRegistry().lookup(SPEC, path))
+    assert ensure_dataset(SPEC, 1000, path, seed=4) == (1000, 4)
+    assert DatasetRegistry().verify(DatasetRegistry().lookup(SPEC, path), full=True)
+    np.testing.assert_array_equal(open_dataset(path).keys(), generate_dataset(SPEC, 1000, seed=4)[0])
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from utils.generation import generate_dataset, make_spec
+from utils.linear import analyze_affine, load_affine
+from utils.screening import contingency_counts, group_values, screen_counts, screen_dataset
+from utils.storage import ArrayDataset
+
+
+def random_dataset(num_samples=4000, key_bits=24, round_key_bits=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return ArrayDataset(rng.integers(0, 2, (num_samples, key_bits), dtype=np.uint8),
+                        rng.integers(0, 2, (num_samples, round_key_bits), dtype=np.uint8))
+
+
+def test_group_values():
+    round_keys = np.array([[1, 0, 1, 1, 0, 1, 1],
+                           [0, 1, 0, 0, 1, 1, 0]], dtype=np.uint8)
+    # Младший бит группы первым, неполная последняя группа отбрасывается
+    np.testing.assert_array_equal(group_values(round_keys, 3), [[5, 5], [2, 6]])
+    np.testing.assert_array_equal(group_values(round_keys, 1), round_keys)
+
+
+def test_contingency_counts():
+    dataset = random_dataset(1000)
+    ones, totals, total = contingency_counts(dataset, group_size=2)
+    assert total == 1000
+    assert ones.shape == (24, 8, 4) and totals.shape == (8, 4)
+    assert (totals.sum(axis=1) == 1000).all()
+    keys, round_keys = dataset.keys(), dataset.last_round_keys()
+    values = group_values(round_keys, 2)
+    assert ones[5, 3, 2] == np.count_nonzero((keys[:, 5] == 1) & (values[:, 3] == 2))
+    # Результат не зависит от размера блока
+    chunked = contingency_counts(dataset, group_size=2, chunk=77)
+    np.testing.assert_array_equal(chunked[0], ones)
+    np.testing.assert_array_equal(chunked[1], totals)
+    with pytest.raises(ValueError):
+        contingency_counts(dataset, group_size=9)
+    with pytest.raises(ValueError):
+        contingency_counts(dataset, start=1000)
+
+
+def test_screen_counts_identical_bits():
+    dataset = random_dataset(2000)
+    keys, round_keys = dataset.keys(), dataset.last_round_keys()
+    keys[:, 0] = round_keys[:, 3]
+    keys[:, 1] = 1 - round_keys[:, 7]
+    pairs = screen_counts(*contingency_counts(ArrayDataset(keys, round_keys)))
+    assert pairs['mutual_information'][0, 3] == pytest.approx(1, abs=0.01)
+    assert pairs['correlation'][0, 3] == pytest.approx(1)
+    assert pairs['correlation'][1, 7] == pytest.approx(-1)
+    assert np.flatnonzero(pairs['significant'].any(axis=1)).tolist() == [0, 1]
+
+
+@pytest.mark.parametrize('group_size', [1, 4])
+def test_random_data_not_flagged(group_size):
+    report = screen_dataset(random_dataset(), group_size=group_size)
+    assert report['flagged_bits'] == []
+    assert not report['worth_training']
+    assert report['groups'] == 16 // group_size
+
+
+def test_screening_matches_gf2_analysis(workdir):
+    """Для SIMON32/64 скрининг находит ровно биты, определенные раундовым ключом."""
+    spec = make_spec('SIMON', 32, 3, 64)
+    keys, round_keys, _ = generate_dataset(spec, 3000, seed=1)
+    report = screen_dataset(ArrayDataset(keys, round_keys))
+    determined = analyze_affine(load_affine('SIMON', 32, 64, 3)).determined
+    assert report['flagged_bits'] == np.flatnonzero(determined).tolist()
+    assert report['worth_training']
+    assert report['samples'] == 3000
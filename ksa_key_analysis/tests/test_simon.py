@@ -0,0 +1,12 @@
+import pytest
+from utils.simon import SimonCipher
+
+CONFIGURATIONS = ((32, 64), (48, 72), (48, 96), (64, 96), (64, 128),
+                  (96, 96), (96, 144), (128, 128), (128, 192), (128, 256))
+
+
+@pytest.mark.parametrize('block_size, key_size', CONFIGURATIONS)
+def test_batch_matches_scalar(check_batch_schedule, block_size, key_size):
+    cipher = SimonCipher(block_size, key_size)
+    for rounds in sorted({1, cipher.num_words, cipher.num_words + 1, 7, cipher.rounds}):
+        check_batch_schedule(cipher, key_size, rounds, seed=rounds)
@@ -0,0 +1,15 @@
+import pytest
+from utils.smallpresent import SmallPresent
+
+
+@pytest.mark.parametrize('sbox_count', [1, 2, 3, 4, 5])
+@pytest.mark.parametrize('block_size', [8, 16, 32, 48, 64])
+def test_batch_matches_scalar(check_batch_schedule, block_size, sbox_count):
+    cipher = SmallPresent(block_size, sbox_count)
+    for rounds in (1, 2, 7, 32):
+        check_batch_schedule(cipher, 80, rounds, seed=rounds)
+
+
+def test_unsupported_sbox_count():
+    with pytest.raises(ValueError):
+        SmallPresent(64, 6)
@@ -0,0 +1,18 @@
+import pytest
+from utils.speck import SpeckCipher
+
+CONFIGURATIONS = ((32, 64), (48, 72), (48, 96), (64, 96), (64, 128),
+                  (96, 96), (96, 144), (128, 128), (128, 192), (128, 256))
+
+
+@pytest.mark.parametrize('block_size, key_size', CONFIGURATIONS)
+def test_batch_matches_scalar(check_batch_schedule, block_size, key_size):
+    # Слова 64 бит (SPECK128) проверяют перенос при сложении по модулю 2^64
+    cipher = SpeckCipher(block_size, key_size)
+    for rounds in sorted({1, 2, 7, cipher.rounds}):
+        check_batch_schedule(cipher, key_size, rounds, seed=rounds)
+
+
+def test_unsupported_configuration():
+    with pytest.raises(ValueError):
+        SpeckCipher(32, 96)
@@ -0,0 +1,78 @@
+import csv
+import json
+import math
+import numpy as np
+import pytest
+
+from utils import stats
+
+
+def test_erfc_matches_math():
+    x = np.linspace(-6, 12, 1001)
+    result = stats.erfc(x)
+    assert result.dtype == np.float64
+    np.testing.assert_allclose(result, [math.erfc(value) for value in x], rtol=1e-6, atol=1e-12)
+
+
+def test_binomial_pvalues():
+    total = 1000
+    successes = np.array([500, 520, 550, 600, 450])
+    pvalues = stats.binomial_pvalues(successes, total)
+    assert pvalues.dtype == np.float64
+    z = np.maximum(np.abs(successes - total / 2) - 0.5, 0) / math.sqrt(total / 4)
+    np.testing.assert_allclose(pvalues, [math.erfc(value / math.sqrt(2)) for value in z], rtol=1e-6)
+    assert pvalues[0] == pytest.approx(1.0)
+    # Симметрия относительно 50%
+    assert pvalues[2] == pytest.approx(pvalues[4])
+
+
+def test_chi2_pvalues():
+    assert stats.chi2_pvalues(3.841459, 1) == pytest.approx(0.05, rel=1e-4)
+    assert stats.chi2_pvalues(293.2478, 255) == pytest.approx(0.05, rel=0.05)
+    assert stats.chi2_pvalues(np.zeros(3), 1).dtype == np.float64
+
+
+def test_wilson_interval():
+    # Табличное значение: 80 из 100, 95% - [0.7112, 0.8666]
+    low, high = stats.wilson_interval([80], 100)
+    assert low[0] == pytest.approx(0.7112, abs=1e-4)
+    assert high[0] == pytest.approx(0.8666, abs=1e-4)
+    low, high = stats.wilson_interval([0, 100], 100)
+    assert low[0] == 0 and high[1] == pytest.approx(1)
+
+
+def test_bootstrap_interval():
+    successes = np.array([300, 500, 700])
+    low, high = stats.bootstrap_interval(successes, 1000, rng=0)
+    p = successes / 1000
+    assert np.all(low < p) and np.all(p < high)
+    wilson_low, wilson_high = stats.wilson_interval(successes, 1000)
+    np.testing.assert_allclose(low, wilson_low, atol=0.01)
+    np.testing.assert_allclose(high, wilson_high, atol=0.01)
+
+
+@pytest.mark.parametrize('method', stats.CI_METHODS)
+def test_bit_report(method):
+    correct = np.array([5000, 5300, 6000, 4000])
+    report = stats.bit_report(correct, np.full(4, 5000), 10000, method=method, rng=0)
+    assert report['samples'] == 10000
+    assert report['key_bits'] == 4
+    assert report['mean_accuracy'] == pytest.approx(correct.mean() / 10000)
+    assert report['bits']['significant'].tolist() == [False, True, True, True]
+    assert report['significant_bits_bonferroni'] == 3
+    with pytest.raises(ValueError):
+        stats.bit_report(correct, correct, 10000, method='exact')
+
+
+def test_save_report(tmp_path):
+    report = stats.exact_report([True, False, True])
+    stats.save_report(report, tmp_path / 'report.json', tmp_path / 'report.csv', cipher='SIMON', rounds=1)
+    with open(tmp_path / 'report.json') as f:
+        saved = json.load(f)
+    assert saved['cipher'] == 'SIMON'
+    assert saved['significant_bits'] == 2
+    assert saved['bits']['accuracy'] == [1.0, 0.5, 1.0]
+    with open(tmp_path / 'report.csv') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['bit'] + list(report['bits'])
+    assert len(rows) == 4
@@ -0,0 +1,78 @@
+import os
+import numpy as np
+import pytest
+import utils.generation
+from utils.generation import SHARD_SIZE, generate_dataset, generate_to_file, make_spec
+from utils.packed import HEADER_SIZE, PackedDataset, read_header
+from utils.storage import open_dataset
+
+SPEC = make_spec('SIMON', 48, 6, 72)
+NUM_SAMPLES = SHARD_SIZE + 1000
+
+
+def assert_dataset(path, seed, num_samples=NUM_SAMPLES):
+    keys, round_keys, _ = generate_dataset(SPEC, num_samples, seed=seed)
+    dataset = open_dataset(path)
+    assert len(dataset) == num_samples
+    assert dataset.num_bits('keys') == 72 and dataset.num_bits('last_round_keys') == 24
+    np.testing.assert_array_equal(dataset.keys(), keys)
+    np.testing.assert_array_equal(dataset.last_round_keys(), round_keys)
+    rows = np.array([5, num_samples - 1, 0])
+    np.testing.assert_array_equal(dataset.unpack('keys', rows), keys[rows])
+
+
+@pytest.mark.parametrize('ext', ['.npz', '.packed'])
+def test_round_trip(workdir, ext):
+    path = 'data/simon' + ext
+    assert generate_to_file(SPEC, NUM_SAMPLES, path, seed=1) == 1
+    assert_dataset(path, 1)
+
+
+@pytest.mark.parametrize('ext', ['.npz', '.packed'])
+def test_resume_after_interruption(workdir, monkeypatch, capsys, ext):
+    path = 'data/simon' + ext
+    iter_shards = utils.generation.iter_shards
+
+    def interrupted(*args, **kwargs):
+        for index, shard in enumerate(iter_shards(*args, **kwargs)):
+            if index == 1:
+                raise KeyboardInterrupt
+            yield shard
+
+    monkeypatch.setattr(utils.generation, 'iter_shards', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        generate_to_file(SPEC, NUM_SAMPLES, path, seed=2)
+    assert not os.path.exists(path)
+
+    # Повторный запуск без seed продолжает незавершенную генерацию с тем же seed
+    monkeypatch.setattr(utils.generation, 'iter_shards', iter_shards)
+    assert generate_to_file(SPEC, NUM_SAMPLES, path) == 2
+    assert "готово 1/2 шардов" in capsys.readouterr().out
+    assert_dataset(path, 2)
+
+
+def test_packed_header_and_size(workdir):
+    path = 'data/simon.packed'
+    generate_to_file(SPEC, NUM_SAMPLES, path, seed=3)
+    header = read_header(path)
+    assert header['complete'] and header['num_samples'] == NUM_SAMPLES
+    # 72 бита ключа и 24 бита раундового ключа - 9 + 3 байт на пример
+    assert header['record_size'] == 12
+    assert os.path.getsize(path) == HEADER_SIZE + NUM_SAMPLES * 12
+
+
+def test_packed_rejects_truncated(workdir):
+    path = 'data/simon.packed'
+    generate_to_file(SPEC, NUM_SAMPLES, path, seed=3)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 1)
+    with pytest.raises(ValueError):
+        PackedDataset(path)
+
+
+def test_open_dataset_prefers_packed(workdir):
+    generate_to_file(SPEC, 1000, 'data/simon.npz', seed=4)
+    generate_to_file(SPEC, 1000, 'data/simon.packed', seed=4)
+    assert isinstance(open_dataset('data/simon'), PackedDataset)
+    with pytest.raises(FileNotFoundError):
+        open_dataset('data/missing')
@@ -0,0 +1,159 @@
+import csv
+import json
+import os
+import subprocess
+from argparse import Namespace
+import pytest
+
+import sweep
+from sweep import Job
+
+
+def cli_args(**overrides):
+    """Аргументы sweep.parse_args без заданных значений."""
+    args = dict.fromkeys(('config_file', 'cipher', 'config', 'rounds', 'sboxes', 'train_samples',
+                          'test_samples', 'jobs', 'threads', 'trajectory', 'algebraic', 'output'))
+    return Namespace(**dict(args, **overrides))
+
+
+def test_parse_config():
+    assert sweep.parse_config('SIMON', '32/64') == (32, 64)
+    assert sweep.parse_config('PRESENT', '64') == (64, 80)
+    assert sweep.parse_config('GIFT', 64) == (64, 128)
+    with pytest.raises(ValueError):
+        sweep.parse_config('SIMON', '32')
+    with pytest.raises(ValueError):
+        sweep.parse_config('PRESENT', '64/128')
+
+
+def test_expand_grid():
+    jobs = sweep.expand_grid([
+        {'cipher': ['SIMON'], 'config': ['32/64'], 'rounds': ['2-3'], 'sboxes': [1, 2]},
+        {'cipher': ['PRESENT'], 'config': ['64'], 'rounds': [4], 'sboxes': [1, 2]},
+        {'cipher': ['SIMON'], 'config': ['32/64'], 'rounds': [3]},
+    ])
+    # S-box - параметр только PRESENT, повторы отбрасываются
+    assert jobs == [
+        Job('SIMON', 32, 64, 2, 1, 100000, 40000),
+        Job('SIMON', 32, 64, 3, 1, 100000, 40000),
+        Job('PRESENT', 64, 80, 4, 1, 100000, 40000),
+        Job('PRESENT', 64, 80, 4, 2, 100000, 40000),
+    ]
+    with pytest.raises(ValueError, match='rounds'):
+        sweep.expand_grid({'cipher': ['SIMON'], 'config': ['32/64']})
+    with pytest.raises(ValueError):
+        sweep.expand_grid({'cipher': ['AES'], 'config': ['128/128'], 'rounds': [1]})
+
+
+def test_option_flags():
+    assert sweep.option_flags({'epochs': 5, 'fast': True, 'bf16': False, 'seed': None}) == \
+        ['--epochs', '5', '--fast']
+
+
+def test_job_commands():
+    job = Job('SPECK', 32, 64, 4, 1, 1000, 500)
+    settings = {'algebraic': False, 'threads': 2, 'generate': {'format': 'npz'},
+                'train': {'epochs': 3}, 'test': {}}
+    commands = sweep.job_commands(job, settings, 'out')
+    assert [stage for stage, _, _ in commands] == ['generate', 'train', 'test']
+    generate, train, test = (args for _, args, _ in commands)
+    assert generate[0] == 'scripts/generate_data_speck.py'
+    assert generate[generate.index('--num_samples') + 1] == '1500'
+    assert generate[generate.index('--workers') + 1] == '2'
+    assert generate[generate.index('--format') + 1] == 'npz'
+    assert train[train.index('--epochs') + 1] == '3'
+    assert test[test.index('--key_size') + 1] == '64'
+    # Признаки готовности: генерация идемпотентна, обучение - файл модели, тест - JSON-отчет
+    assert commands[0][2] is None
+    assert commands[1][2].endswith('.weights.h5')
+    assert commands[2][2] == sweep.report_json(job, 'out')
+
+
+def test_load_settings(tmp_path):
+    config_file = tmp_path / 'grid.json'
+    config_file.write_text(json.dumps({'grid': {'cipher': ['SIMON'], 'config': ['32/64'], 'rounds': [2]},
+                                       'train': {'epochs': 3}, 'jobs': 4}))
+    settings = sweep.load_settings(cli_args(config_file=str(config_file), rounds=['5'], threads=2,
+                                            output=str(tmp_path / 'out')))
+    # Аргументы CLI переопределяют значения сетки и файла
+    assert settings['grid'] == [{'cipher': ['SIMON'], 'config': ['32/64'], 'rounds': ['5']}]
+    assert settings['train'] == {'epochs': 3}
+    assert (settings['jobs'], settings['threads']) == (4, 2)
+    assert settings['output'] == str(tmp_path / 'out')
+
+    config_file.write_text(json.dumps({'epochs': 3}))
+    with pytest.raises(ValueError):
+        sweep.load_settings(cli_args(config_file=str(config_file)))
+
+
+def test_write_summary(tmp_path):
+    settings = {'output': str(tmp_path)}
+    done, failed = Job('SIMON', 32, 64, 2, 1, 1000, 500), Job('SIMON', 32, 64, 3, 1, 1000, 500)
+    results_dir = tmp_path / sweep.job_name(done)
+    results_dir.mkdir()
+    report = {'mean_accuracy': 0.75, 'significant_bits': 16, 'significant_bits_bonferroni': 15}
+    with open(sweep.report_json(done, str(results_dir)), 'w') as f:
+        json.dump(report, f)
+    path = sweep.write_summary([(done, 'done'), (failed, 'failed: train')], settings)
+    with open(path) as f:
+        rows = list(csv.DictReader(f))
+    assert [row['status'] for row in rows] == ['done', 'failed: train']
+    assert rows[0]['mean_accuracy'] == '0.75' and rows[0]['significant_bits'] == '16'
+    assert rows[1]['mean_accuracy'] == ''
+
+
+def test_run_job_skips_finished_stages(tmp_path, monkeypatch):
+    """Этапы с готовым результатом и завершенные задания не запускаются повторно."""
+    calls = []
+
+    def fake_run(args, **kwargs):
+        calls.append(args[1])
+        return Namespace(returncode=0)
+
+    monkeypatch.setattr(sweep.subprocess, 'run', fake_run)
+    job = Job('SIMON', 32, 64, 2, 1, 1000, 500)
+    settings = {'algebraic': False, 'threads': 1, 'generate': {}, 'train': {}, 'test': {},
+                'output': str(tmp_path)}
+    results_dir = os.path.join(str(tmp_path), sweep.job_name(job))
+    os.makedirs(results_dir)
+    open(sweep.model_path(job, results_dir), 'w').close()
+    assert sweep.run_job(job, settings) == 'done'
+    assert calls == ['scripts/generate_data_simon.py', 'scripts/test_model.py']
+
+    open(sweep.report_json(job, results_dir), 'w').close()
+    assert sweep.run_job(job, settings) == 'skipped'
+    assert len(calls) == 2
+
+
+def test_trajectory_sweep_with_algebraic_jobs(workdir, monkeypatch):
+    """
+    В режиме trajectory задания точного анализа над GF(2) выполняются отдельно (не
+    группируются в траекторию) и сохраняют отчеты; обучение - только у нелинейных АРК.
+    """
+    real_run = subprocess.run
+    stages = []
+
+    def run_in_workdir(args, cwd, **kwargs):
+        # Скрипты запускаются из рабочего каталога теста (кэш АРК и датасеты - в tmp_path)
+        stages.append(os.path.basename(args[1]))
+        if args[1] != 'scripts/analyze_linear.py':
+            return Namespace(returncode=0)
+        return real_run([args[0], os.path.join(cwd, args[1])] + args[2:], cwd=str(workdir), **kwargs)
+
+    monkeypatch.setattr(sweep.subprocess, 'run', run_in_workdir)
+    settings = sweep.load_settings(cli_args(cipher=['SIMON', 'SPECK'], config=['32/64'], rounds=['2-3'],
+                                            trajectory=True, algebraic=True, output=str(workdir / 'sweep')))
+    jobs = sweep.expand_grid(settings['grid'])
+    with open(sweep.run_sweep(jobs, settings)) as f:
+        rows = list(csv.DictReader(f))
+
+    simon = [job for job in jobs if job.cipher == 'SIMON']
+    for job in simon:
+        assert os.path.exists(sweep.report_json(job, os.path.join(settings['output'], sweep.job_name(job))))
+    assert stages.count('analyze_linear.py') == 2
+    # SPECK: одна генерация траектории на оба раунда
+    assert stages.count('generate_data_speck.py') == 1
+    assert stages.count('train_model.py') == 2
+    assert [row['status'] for row in rows] == ['done'] * 4
+    simon_rows = [row for row in rows if row['cipher'] == 'SIMON']
+    assert all(row['mean_accuracy'] and row['significant_bits'] for row in simon_rows)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+from models.input_pipeline import make_array_dataset
+from models.ksa_model import build_output_model, predict_key_bits
+from models.pipeline import fit_model
+from models.training import BitAccuracyReport
+
+
+def small_model(key_bits, head):
+    inputs = tf.keras.Input(shape=(8,))
+    x = tf.keras.layers.Dense(16, activation='relu')(inputs)
+    return build_output_model(inputs, x, key_bits, head=head)
+
+
+@pytest.mark.parametrize('head', ['per_bit', 'multilabel'])
+def test_bit_accuracy_report(head, capsys):
+    """Точность каждого бита на валидации совпадает с подсчетом по предсказаниям."""
+    rng = np.random.default_rng(0)
+    key_bits = 3
+    round_keys = rng.integers(0, 2, (256, 8), dtype=np.uint8)
+    # Бит 0 - копия входа, остальные случайны
+    keys = np.column_stack([round_keys[:, 0], rng.integers(0, 2, (256, key_bits - 1), dtype=np.uint8)])
+    train = make_array_dataset(keys[:192], round_keys[:192], 32, key_bits, head=head)
+    validation = make_array_dataset(keys[192:], round_keys[192:], 32, key_bits, head=head)
+
+    model = small_model(key_bits, head)
+    report = BitAccuracyReport(validation)
+    fit_model(model, train, validation, epochs=2, batch_size=32, verbose=0, callbacks=[report])
+
+    predicted = predict_key_bits(model.predict(round_keys[192:].astype(np.float32), verbose=0))
+    expected = (predicted == keys[192:]).mean(axis=0)
+    assert report.accuracy.shape == (key_bits,)
+    np.testing.assert_allclose(report.accuracy, expected, atol=1e-6)
+    assert "Точность битов на валидации" in capsys.readouterr().out
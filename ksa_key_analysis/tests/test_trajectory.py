@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from utils.generation import (dataset_stem, ensure_dataset, generate_dataset, make_spec,
+                              open_round_dataset, round_spec)
+
+TRAJECTORY = [1, 2, 3, 5]
+
+CONFIGS = [
+    ('PRESENT', 64, None),
+    ('SIMON', 32, 64),
+    ('SPECK', 64, 128),
+    ('GIFT', 64, None),
+    ('RECTANGLE', 64, 128),
+]
+
+
+@pytest.mark.parametrize('cipher, block_size, key_size', CONFIGS)
+def test_trajectory_matches_round_datasets(workdir, cipher, block_size, key_size):
+    """Столбцы каждого раунда траектории совпадают с обычным датасетом этого раунда."""
+    spec = make_spec(cipher, block_size, 0, key_size, trajectory=TRAJECTORY)
+    assert spec.rounds == TRAJECTORY[-1]
+    keys, round_keys, _ = generate_dataset(spec, 300, seed=11)
+    for i, rounds in enumerate(TRAJECTORY):
+        expected_keys, expected_round_keys, _ = generate_dataset(round_spec(spec, rounds), 300, seed=11)
+        width = expected_round_keys.shape[1]
+        assert round_keys.shape[1] == len(TRAJECTORY) * width
+        np.testing.assert_array_equal(keys, expected_keys)
+        np.testing.assert_array_equal(round_keys[:, i * width:(i + 1) * width], expected_round_keys)
+
+
+def test_open_round_dataset(workdir):
+    spec = make_spec('SIMON', 32, 0, 64, trajectory=TRAJECTORY)
+    ensure_dataset(spec, 200, dataset_stem(spec) + '.packed', seed=5)
+    expected_keys, expected_round_keys, _ = generate_dataset(round_spec(spec, 3), 200, seed=5)
+
+    dataset = open_round_dataset(round_spec(spec, 3), TRAJECTORY)
+    assert len(dataset) == 200
+    # Раундовый ключ SIMON - одно слово
+    assert dataset.num_bits('last_round_keys') == 16
+    assert dataset.num_bits('keys') == 64
+    np.testing.assert_array_equal(dataset.keys(), expected_keys)
+    np.testing.assert_array_equal(dataset.last_round_keys(10, 20), expected_round_keys[10:20])
+    np.testing.assert_array_equal(dataset.unpack('last_round_keys', np.array([3, 7])),
+                                  expected_round_keys[[3, 7]])
+    with pytest.raises(ValueError):
+        open_round_dataset(round_spec(spec, 4), TRAJECTORY)
+
+
+def test_invalid_trajectory():
+    with pytest.raises(ValueError):
+        make_spec('SIMON', 32, 0, 64, trajectory=[0, 2])
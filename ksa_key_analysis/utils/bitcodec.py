@@ -0,0 +1,88 @@
+import numpy as np
+
+# Порядок бит, общий для всех шифров и датасетов:
+#
+# * мастер-ключ - матрица (N, key_size) uint8, столбец 0 - СТАРШИЙ бит ключа,
+#   т. е. master_key = int(''.join(map(str, key_bits[i])), 2). Упакованный вид -
+#   np.packbits(key_bits, axis=1) (bitorder='big'), байты ключа в порядке big-endian;
+# * раундовый ключ - матрица (N, n) uint8, столбец j - бит j (МЛАДШИЙ бит первым),
+#   т. е. key_bits[i, j] = (round_key >> j) & 1. Упакованный вид -
+#   np.packbits(bits, axis=1, bitorder='little'), байты в порядке little-endian;
+# * слова (многолимбовое представление) - массив (N, m) uint64, слово i = (key >> i*w) & mask,
+#   слово 0 - младшее.
+
+KEY_BITORDER = 'big'
+ROUND_KEY_BITORDER = 'little'
+
+
+def sample_keys(num_samples, key_size, rng=None):
+    """
+    Случайные мастер-ключи из сырых случайных байт генератора.
+    Ключ i зависит только от первых (i + 1) * ceil(key_size / 64) 64-битных
+    выходов генератора, поэтому меньшая выборка - префикс большей.
+    :param rng: np.random.Generator (None - новый генератор с энтропией ОС)
+    :return: массив (N, key_size) uint8, столбец 0 - старший бит ключа
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    words_per_key = -(-key_size // 64)
+    raw = rng.bit_generator.random_raw(num_samples * words_per_key).astype('<u8')
+    key_bytes = raw.view(np.uint8).reshape(num_samples, words_per_key * 8)
+    return np.unpackbits(key_bytes, axis=1, count=key_size)
+
+
+def pack_key_bits(key_bits):
+    """Матрица битов ключа -> (N, ceil(key_size / 8)) байт, big-endian."""
+    return np.packbits(key_bits, axis=-1, bitorder=KEY_BITORDER)
+
+
+def unpack_key_bits(packed, key_size):
+    """Обратное к pack_key_bits."""
+    return np.unpackbits(packed, axis=-1, count=key_size, bitorder=KEY_BITORDER)
+
+
+def pack_round_key_bits(round_key_bits):
+    """Матрица битов раундового ключа -> (N, ceil(n / 8)) байт, little-endian."""
+    return np.packbits(round_key_bits, axis=-1, bitorder=ROUND_KEY_BITORDER)
+
+
+def unpack_round_key_bits(packed, num_bits):
+    """Обратное к pack_round_key_bits."""
+    return np.unpackbits(packed, axis=-1, count=num_bits, bitorder=ROUND_KEY_BITORDER)
+
+
+def key_bits_to_ints(key_bits):
+    """Матрица битов ключа -> список целых Python (для скалярных реализаций)."""
+    return [int.from_bytes(row.tobytes(), 'big') >> (-key_bits.shape[1] % 8)
+            for row in pack_key_bits(key_bits)]
+
+
+def bits_to_words(key_bits, word_size):
+    """
+    Перевод матрицы битов ключей в массив слов.
+    :param key_bits: массив (N, key_size) uint8, столбец 0 - старший бит ключа
+    :param word_size: размер слова в битах (не более 64)
+    :return: массив (N, key_size // word_size) uint64, слово i = (key >> i*word_size) & mask
+    """
+    key_bits = np.asarray(key_bits, dtype=np.uint8)
+    num_samples, key_size = key_bits.shape
+    if word_size > 64 or key_size % word_size:
+        raise ValueError(f"Unsupported word size {word_size} for key size {key_size}")
+
+    num_words = key_size // word_size
+    # Разворачиваем столбцы: младший бит ключа становится первым
+    lsb_first = key_bits[:, ::-1].reshape(num_samples, num_words, word_size)
+    packed = np.packbits(lsb_first, axis=-1, bitorder='little')
+    padded = np.zeros((num_samples, num_words, 8), dtype=np.uint8)
+    padded[..., :packed.shape[-1]] = packed
+    return padded.view('<u8')[..., 0].astype(np.uint64)
+
+
+def words_to_bits(words, word_size):
+    """
+    Перевод массива слов в матрицу битов (младший бит первым).
+    :param words: массив uint64 произвольной формы (...)
+    :param word_size: число сохраняемых бит слова
+    :return: массив (..., word_size) uint8, столбец j = (word >> j) & 1
+    """
+    as_bytes = np.ascontiguousarray(words, dtype='<u8')[..., None].view(np.uint8)
+    return np.unpackbits(as_bytes, axis=-1, bitorder='little')[..., :word_size]
@@ -0,0 +1,328 @@
+import itertools
+import os
+from collections import namedtuple
+from functools import lru_cache
+from multiprocessing import Pool, Process, Queue
+from queue import Empty
+import numpy as np
+from utils.bitcodec import sample_keys
+from utils import profiling
+from utils.linear import AffineKeySchedule, load_affine
+from utils.rectangle import RectangleCipher
+from utils.smallpresent import SmallPresent
+from utils.speck import SpeckCipher
+from utils.registry import DatasetRegistry
+from utils.storage import RoundSelection, extend_dataset, open_dataset, open_dataset_writer
+
+# Размер шарда фиксирован и не зависит от числа процессов: шард i всегда
+# содержит примеры [i * SHARD_SIZE, (i + 1) * SHARD_SIZE) и свой поток случайных чисел
+SHARD_SIZE = 1 << 16
+
+# Интервал (секунды) проверки процессов-производителей KeyStream, пока очередь пуста
+PRODUCER_POLL_INTERVAL = 1.0
+
+# trajectory - раунды, ключи которых хранятся в датасете-траектории (rounds - последний из них);
+# пустой кортеж - обычный датасет с ключом только раунда rounds
+DatasetSpec = namedtuple('DatasetSpec', ['cipher', 'block_size', 'key_size', 'rounds', 'sboxes', 'trajectory'])
+DatasetSpec.__new__.__defaults__ = (1, ())
+
+# Размер ключа шифров с единственным вариантом ключа
+FIXED_KEY_SIZES = {'PRESENT': 80, 'GIFT': 128}
+
+
+# Индекс раунда r в результате generate_round_keys_batch(..., all_rounds=True): r - смещение
+# (у RECTANGLE первым идет ключ раунда 0)
+ALL_ROUNDS_OFFSET = {'PRESENT': 1, 'SPECK': 1, 'RECTANGLE': 0}
+
+
+def make_spec(cipher, block_size, rounds, key_size=None, sboxes=1, trajectory=None):
+    """
+    DatasetSpec по параметрам скриптов (размер ключа PRESENT и GIFT фиксирован).
+    :param trajectory: раунды датасета-траектории (rounds при этом - последний из них)
+    """
+    if cipher in FIXED_KEY_SIZES:
+        key_size = FIXED_KEY_SIZES[cipher]
+    elif key_size is None:
+        raise ValueError(f"Для {cipher} необходимо указать размер ключа")
+    trajectory = tuple(sorted(set(trajectory or ())))
+    if trajectory:
+        if trajectory[0] < 1:
+            raise ValueError(f"Invalid trajectory rounds: {trajectory}")
+        rounds = trajectory[-1]
+    return DatasetSpec(cipher, block_size, key_size, rounds, sboxes if cipher == 'PRESENT' else 1, trajectory)
+
+
+def parse_rounds(values):
+    """Числа раундов: целые и диапазоны вида "2-5"."""
+    rounds = []
+    for value in values:
+        first, _, last = str(value).partition('-')
+        rounds.extend(range(int(first), int(last or first) + 1))
+    return rounds
+
+
+def format_rounds(rounds):
+    """Раунды -> компактная запись для имен файлов: (1, 2, 3, 5) -> "1-3.5"."""
+    parts = []
+    for _, group in itertools.groupby(enumerate(sorted(rounds)), key=lambda item: item[1] - item[0]):
+        group = [value for _, value in group]
+        parts.append(f"{group[0]}-{group[-1]}" if len(group) > 1 else str(group[0]))
+    return ".".join(parts)
+
+
+def spec_suffix(spec):
+    """Суффикс имен файлов (вариант PRESENT с 1 S-box - без суффикса)."""
+    return f"_s{spec.sboxes}" if spec.sboxes != 1 else ""
+
+
+def dataset_stem(spec, data_dir="data"):
+    """Имя файла датасета без расширения (см. utils.storage.open_dataset)."""
+    rounds = f"t{format_rounds(spec.trajectory)}" if spec.trajectory else spec.rounds
+    return (f"{data_dir}/{spec.cipher.lower()}_{spec.block_size}_{spec.key_size}_{rounds}"
+            f"{spec_suffix(spec)}_keys")
+
+
+def round_spec(spec, rounds):
+    """Конфигурация обычного датасета с ключом раунда rounds (например, из траектории spec)."""
+    return spec._replace(rounds=rounds, trajectory=())
+
+
+def open_round_dataset(spec, trajectory=None, data_dir="data"):
+    """
+    Датасет конфигурации spec: файл dataset_stem(spec) или, если заданы раунды траектории
+    (среди них spec.rounds), ключи раунда spec.rounds из датасета-траектории.
+    """
+    if not trajectory:
+        return open_dataset(dataset_stem(spec, data_dir))
+    data_spec = make_spec(spec.cipher, spec.block_size, spec.rounds, spec.key_size, spec.sboxes, trajectory)
+    return RoundSelection(open_dataset(dataset_stem(data_spec, data_dir)), data_spec.trajectory, spec.rounds)
+
+
+@lru_cache(maxsize=None)
+def _engine(spec):
+    """Функция key_bits -> биты последнего раундового ключа для конфигурации spec."""
+    if spec.trajectory:
+        return _trajectory_engine(spec)
+    if spec.cipher == 'PRESENT':
+        cipher = SmallPresent(spec.block_size, spec.sboxes)
+        return lambda key_bits: cipher.generate_round_keys_batch(key_bits, spec.rounds)
+    if spec.cipher in ('SIMON', 'GIFT'):
+        # Линейные АРК: одно умножение на матрицу над GF(2)
+        return load_affine(spec.cipher, spec.block_size, spec.key_size, spec.rounds).apply
+    if spec.cipher == 'SPECK':
+        cipher = SpeckCipher(spec.block_size, spec.key_size, spec.rounds)
+        return lambda key_bits: cipher.generate_round_keys_batch(key_bits, spec.rounds)
+    if spec.cipher == 'RECTANGLE':
+        cipher = RectangleCipher(spec.block_size, spec.key_size, spec.rounds)
+        return lambda key_bits: cipher.generate_round_keys_batch(key_bits, spec.rounds)
+    raise ValueError(f"Unsupported cipher: {spec.cipher}")
+
+
+def _trajectory_engine(spec):
+    """
+    Функция key_bits -> ключи раундов spec.trajectory подряд (N, len(trajectory) * n) за один проход
+    расширения ключа; столбцы раунда r совпадают с датасетом round_spec(spec, r).
+    """
+    if spec.cipher in ('SIMON', 'GIFT'):
+        # Отображения раундов объединяются в одно: одно умножение на матрицу для всех раундов
+        schedules = [load_affine(spec.cipher, spec.block_size, spec.key_size, r) for r in spec.trajectory]
+        return AffineKeySchedule(np.vstack([s.matrix for s in schedules]),
+                                 np.concatenate([s.constant for s in schedules])).apply
+    if spec.cipher == 'PRESENT':
+        cipher = SmallPresent(spec.block_size, spec.sboxes)
+    elif spec.cipher == 'SPECK':
+        cipher = SpeckCipher(spec.block_size, spec.key_size, spec.rounds)
+    elif spec.cipher == 'RECTANGLE':
+        cipher = RectangleCipher(spec.block_size, spec.key_size, spec.rounds)
+    else:
+        raise ValueError(f"Unsupported cipher: {spec.cipher}")
+    index = [r - ALL_ROUNDS_OFFSET[spec.cipher] for r in spec.trajectory]
+
+    def trajectory_keys(key_bits):
+        round_keys = cipher.generate_round_keys_batch(key_bits, spec.rounds, all_rounds=True)[:, index]
+        return round_keys.reshape(len(key_bits), -1)
+    return trajectory_keys
+
+
+def last_round_keys(spec, key_bits):
+    """Биты последнего раундового ключа (у траектории - ключей всех ее раундов) для матрицы мастер-ключей."""
+    return _engine(spec)(key_bits)
+
+
+def round_key_bits(spec):
+    """Длина сохраняемого раундового ключа (у траектории - всех ее ключей) в битах."""
+    return last_round_keys(spec, np.zeros((1, spec.key_size), dtype=np.uint8)).shape[1]
+
+
+def shard_seed(entropy, index):
+    """Поток шарда index: то же, что SeedSequence(entropy).spawn(index + 1)[index]."""
+    return np.random.SeedSequence(entropy, spawn_key=(index,))
+
+
+def _generate_shard(task):
+    spec, seed_seq, count = task
+    with profiling.span('sample_keys', samples=count):
+        key_bits = sample_keys(count, spec.key_size, np.random.default_rng(seed_seq))
+    with profiling.span('key_expansion', samples=count):
+        return key_bits, last_round_keys(spec, key_bits)
+
+
+def iter_shards(spec, num_samples, entropy, workers=1, start_shard=0):
+    """
+    Генерация шардов по порядку (параллельно при workers > 1).
+    :return: итератор пар (key_bits, last_round_keys) шардов start_shard, start_shard + 1, ...
+    """
+    num_shards = -(-num_samples // SHARD_SIZE)
+    tasks = [
+        (spec, shard_seed(entropy, i), min(SHARD_SIZE, num_samples - i * SHARD_SIZE))
+        for i in range(start_shard, num_shards)
+    ]
+    # Таблицы/матрицы АРК готовятся до запуска процессов и наследуются ими
+    _engine(spec)
+    if workers <= 1:
+        for task in tasks:
+            yield _generate_shard(task)
+        return
+    with Pool(workers) as pool:
+        yield from pool.imap(_generate_shard, tasks)
+
+
+def iter_range(spec, entropy, start, stop, workers=1):
+    """
+    Примеры [start, stop) датасета с данным seed - те же, что в полном датасете.
+    Шард i с меньшим числом примеров - префикс того же шарда с большим числом.
+    :return: итератор пар (key_bits, last_round_keys)
+    """
+    first_shard = start // SHARD_SIZE
+    skip = start - first_shard * SHARD_SIZE
+    for shard_keys, shard_round_keys in iter_shards(spec, stop, entropy, workers, first_shard):
+        yield shard_keys[skip:], shard_round_keys[skip:]
+        skip = 0
+
+
+def generate_dataset(spec, num_samples, workers=1, seed=None):
+    """
+    Генерация датасета шардами. Результат для заданного seed не зависит от workers.
+    :return: (key_bits, last_round_keys, entropy), entropy - фактически использованный seed
+    """
+    entropy = np.random.SeedSequence(seed).entropy
+    key_bits, round_keys = None, None
+    offset = 0
+    for shard_keys, shard_round_keys in iter_shards(spec, num_samples, entropy, workers):
+        if key_bits is None:
+            key_bits = np.empty((num_samples, shard_keys.shape[1]), dtype=np.uint8)
+            round_keys = np.empty((num_samples, shard_round_keys.shape[1]), dtype=np.uint8)
+        key_bits[offset:offset + len(shard_keys)] = shard_keys
+        round_keys[offset:offset + len(shard_keys)] = shard_round_keys
+        offset += len(shard_keys)
+    return key_bits, round_keys, entropy
+
+
+def _produce(spec, entropy, first_shard, step, shard_size, queue):
+    """Процесс-производитель: шарды first_shard, first_shard + step, ... в очередь (бесконечно)."""
+    for index in itertools.count(first_shard, step):
+        queue.put(_generate_shard((spec, shard_seed(entropy, index), shard_size)))
+
+
+class KeyStream:
+    """
+    Бесконечный поток свежих примеров (key_bits, last_round_keys) без записи на диск:
+    producers процессов генерируют шарды first_shard, first_shard + 1, ...
+    (тем же способом, что и датасет с данным seed) и передают их через очередь
+    ограниченного размера queue_size - генерация идет параллельно с потреблением,
+    а память ограничена. Порядок шардов в потоке зависит от скорости процессов.
+    """
+
+    def __init__(self, spec, entropy, first_shard=0, producers=1, queue_size=4, shard_size=SHARD_SIZE):
+        # Таблицы/матрицы АРК готовятся до запуска процессов и наследуются ими
+        _engine(spec)
+        self.queue = Queue(queue_size)
+        self.processes = [
+            Process(target=_produce, args=(spec, entropy, first_shard + i, producers, shard_size, self.queue),
+                    daemon=True)
+            for i in range(producers)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def __iter__(self):
+        while True:
+            try:
+                yield self.queue.get(timeout=PRODUCER_POLL_INTERVAL)
+            except Empty:
+                # Производитель мог завершиться с ошибкой (или быть убит OOM killer): без проверки поток ждал бы вечно
+                for process in self.processes:
+                    if not process.is_alive():
+                        raise RuntimeError(f"Key stream producer {process.name} died (exit code {process.exitcode})")
+
+    def close(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        self.queue.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def generate_to_file(spec, num_samples, path, workers=1, seed=None):
+    """
+    Потоковая генерация датасета в файл (.npz или .packed - по расширению path):
+    в памяти находятся только текущие шарды,
+    после прерывания повторный запуск продолжает с последнего записанного шарда.
+    :return: entropy - фактически использованный seed
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    writer = open_dataset_writer(path, spec, num_samples, SHARD_SIZE,
+                                 spec.key_size, round_key_bits(spec), seed)
+    if writer.completed_shards:
+        print(f"Продолжение генерации: готово {writer.completed_shards}/{writer.num_shards} шардов")
+    for shard_keys, shard_round_keys in iter_shards(spec, num_samples, writer.entropy, workers,
+                                                    start_shard=writer.completed_shards):
+        with profiling.span('write_shard', samples=len(shard_keys)):
+            writer.write_shard(shard_keys, shard_round_keys)
+    with profiling.span('finalize'):
+        writer.finalize()
+    return writer.entropy
+
+
+def ensure_dataset(spec, num_samples, path, workers=1, seed=None, force=False, verify=False):
+    """
+    Датасет не менее чем из num_samples примеров в path с учетом реестра:
+    * зарегистрированный файл с тем же spec (и seed, если задан), достаточным
+      числом примеров и верной контрольной суммой используется повторно
+      (контрольная сумма пересчитывается, только если изменились размер или время
+      изменения файла либо задан verify);
+    * если примеров меньше, генерируются и дописываются только недостающие;
+    * иначе (нет записи, файл поврежден или force) датасет генерируется заново.
+    :return: (число примеров в файле, entropy)
+    """
+    registry = DatasetRegistry()
+    entry = None if force else registry.lookup(spec, path, seed)
+    if entry is not None:
+        with profiling.span('verify_checksum'):
+            verified = registry.verify(entry, verify)
+        if not verified:
+            print(f"Датасет {path} не совпадает с контрольной суммой в реестре, генерация заново")
+            entry = None
+
+    if entry is None:
+        entropy = generate_to_file(spec, num_samples, path, workers, seed)
+        registry.record(spec, entropy, path, num_samples)
+        return num_samples, entropy
+
+    entropy = int(entry['seed'])
+    available = entry['num_samples']
+    if available >= num_samples:
+        print(f"Используется существующий датасет {path} ({available} примеров)")
+        return available, entropy
+
+    print(f"Дополнение датасета {path}: {available} -> {num_samples} примеров")
+    with profiling.span('extend_dataset', samples=num_samples - available):
+        total = extend_dataset(path, iter_range(spec, entropy, available, num_samples, workers))
+    registry.record(spec, entropy, path, total)
+    return total, entropy
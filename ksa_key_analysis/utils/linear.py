@@ -0,0 +1,170 @@
+import os
+from collections import namedtuple
+import numpy as np
+from utils.bitcodec import key_bits_to_ints, pack_key_bits, sample_keys, pack_round_key_bits, unpack_round_key_bits
+from utils.gift import GiftCipher
+from utils.simon import SimonCipher
+
+# Шифры, у которых последний раундовый ключ - аффинная функция мастер-ключа над GF(2)
+LINEAR_CIPHERS = ('GIFT', 'SIMON')
+
+# Результат analyze_affine:
+#   rank               - ранг матрицы A (число независимых линейных функций ключа в раундовом ключе);
+#   kernel_dimension   - key_size - rank: по раундовому ключу остается 2^kernel_dimension ключей;
+#   determined         - (key_size,) bool, бит ключа однозначно определяется раундовым ключом;
+#   basis              - (rank, key_size) ступенчатый вид A: строка - определяемая сумма битов ключа;
+#   pivots             - ведущие столбцы строк basis.
+GF2Analysis = namedtuple('GF2Analysis', ['rank', 'kernel_dimension', 'determined', 'basis', 'pivots'])
+
+# Версия формата кэша: при изменении схемы старые матрицы пересчитываются
+CACHE_VERSION = 1
+CACHE_DIR = "data/linear"
+
+
+class AffineKeySchedule:
+    """
+    Аффинное отображение над GF(2): round_key = A · key ⊕ c.
+    Столбец j матрицы A соответствует столбцу j матрицы битов ключа
+    (столбец 0 - старший бит), строка i - биту i раундового ключа.
+    """
+
+    def __init__(self, matrix, constant):
+        """
+        :param matrix: массив (out_bits, key_size) из 0/1
+        :param constant: массив (out_bits,) из 0/1
+        """
+        self.matrix = np.asarray(matrix, dtype=np.uint8)
+        self.constant = np.asarray(constant, dtype=np.uint8)
+        self.out_bits, self.key_size = self.matrix.shape
+        if self.key_size % 8:
+            raise ValueError(f"Key size must be a multiple of 8, got {self.key_size}")
+        self._tables = self._build_tables()
+        self._packed_constant = pack_round_key_bits(self.constant)
+
+    def _build_tables(self):
+        """
+        Таблицы для умножения по байтам ключа (метод четырех русских):
+        tables[b, v] - упакованный вклад байта b ключа со значением v.
+        """
+        byte_bits = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1)
+        tables = []
+        for b in range(self.key_size // 8):
+            columns = self.matrix[:, 8*b:8*b + 8].astype(np.int32)
+            contribution = (byte_bits.astype(np.int32) @ columns.T) & 1
+            tables.append(pack_round_key_bits(contribution.astype(np.uint8)))
+        return np.stack(tables)
+
+    def apply_packed(self, packed_keys):
+        """
+        :param packed_keys: массив (N, key_size // 8), pack_key_bits от матрицы битов ключа
+        :return: массив (N, ceil(out_bits / 8)), pack_round_key_bits от битов раундового ключа
+        """
+        result = np.broadcast_to(self._packed_constant, (len(packed_keys), self._tables.shape[2])).copy()
+        for b in range(self._tables.shape[0]):
+            result ^= self._tables[b][packed_keys[:, b]]
+        return result
+
+    def apply(self, key_bits):
+        """
+        :param key_bits: массив (N, key_size) uint8, столбец 0 - старший бит ключа
+        :return: массив (N, out_bits) uint8, бит j раундового ключа в столбце j
+        """
+        return unpack_round_key_bits(self.apply_packed(pack_key_bits(key_bits)), self.out_bits)
+
+    def save(self, path):
+        np.savez(path, version=CACHE_VERSION, matrix=self.matrix, constant=self.constant)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        if int(data["version"]) != CACHE_VERSION:
+            raise ValueError(f"Outdated cache version in {path}")
+        return cls(data["matrix"], data["constant"])
+
+
+def gf2_rref(matrix):
+    """
+    Приведенный ступенчатый вид матрицы над GF(2) (метод Гаусса, строки обрабатываются векторно).
+    :return: (ненулевые строки (rank, n) uint8, ведущие столбцы (rank,))
+    """
+    rows = np.array(matrix, dtype=np.uint8) & 1
+    pivots = []
+    rank = 0
+    for column in range(rows.shape[1]):
+        if rank == len(rows):
+            break
+        candidates = np.flatnonzero(rows[rank:, column])
+        if not len(candidates):
+            continue
+        pivot = rank + candidates[0]
+        rows[[rank, pivot]] = rows[[pivot, rank]]
+        others = rows[:, column].astype(bool)
+        others[rank] = False
+        rows[others] ^= rows[rank]
+        pivots.append(column)
+        rank += 1
+    return rows[:rank], np.array(pivots, dtype=np.int64)
+
+
+def analyze_affine(schedule):
+    """
+    Что раундовый ключ A · key ⊕ c сообщает о мастер-ключе. Бит j определен, если
+    единичный вектор e_j лежит в пространстве строк A, т. е. в ступенчатом виде есть
+    строка, равная e_j. Остальные биты (при случайном ключе) не зависят от раундового ключа.
+    :return: GF2Analysis
+    """
+    basis, pivots = gf2_rref(schedule.matrix)
+    determined = np.zeros(schedule.key_size, dtype=bool)
+    determined[pivots[basis.sum(axis=1) == 1]] = True
+    return GF2Analysis(len(pivots), schedule.key_size - len(pivots), determined, basis, pivots)
+
+
+def _last_round_key_function(cipher_name, block_size, key_size, rounds):
+    """Скалярная функция master_key -> последний раундовый ключ и его длина в битах."""
+    if cipher_name == 'GIFT':
+        cipher = GiftCipher(block_size)
+        return (lambda key: cipher.generate_round_keys(key, rounds)[-1]), block_size
+    if cipher_name == 'SIMON':
+        cipher = SimonCipher(block_size, key_size, rounds)
+        return (lambda key: cipher.generate_round_keys(key, rounds)[-1]), cipher.word_size
+    raise ValueError(f"Cipher {cipher_name} has no linear key schedule")
+
+
+def compile_affine(cipher_name, block_size, key_size, rounds, check_samples=64, seed=0):
+    """
+    Вычисление аффинного отображения мастер-ключ -> последний раундовый ключ
+    по значениям на нулевом ключе и единичных векторах с проверкой на случайных ключах.
+    """
+    last_round_key, out_bits = _last_round_key_function(cipher_name, block_size, key_size, rounds)
+    to_bits = lambda value: [(value >> j) & 1 for j in range(out_bits)]
+
+    constant_value = last_round_key(0)
+    matrix = np.zeros((out_bits, key_size), dtype=np.uint8)
+    for j in range(key_size):
+        matrix[:, j] = to_bits(last_round_key(1 << (key_size - 1 - j)) ^ constant_value)
+    schedule = AffineKeySchedule(matrix, to_bits(constant_value))
+
+    # Проверка: отображение должно совпадать со скалярной реализацией
+    key_bits = sample_keys(check_samples, key_size, np.random.default_rng(seed))
+    predicted = schedule.apply(key_bits)
+    for i, master_key in enumerate(key_bits_to_ints(key_bits)):
+        if list(predicted[i]) != to_bits(last_round_key(master_key)):
+            raise ValueError(f"Key schedule of {cipher_name}{block_size}/{key_size} is not affine over GF(2)")
+    return schedule
+
+
+def load_affine(cipher_name, block_size, key_size, rounds, cache_dir=CACHE_DIR):
+    """Аффинное отображение из кэша на диске (при отсутствии - вычисляется и сохраняется)."""
+    path = os.path.join(cache_dir, f"{cipher_name.lower()}_{block_size}_{key_size}_{rounds}.npz")
+    if os.path.exists(path):
+        try:
+            return AffineKeySchedule.load(path)
+        except (ValueError, KeyError, OSError):
+            pass
+    schedule = compile_affine(cipher_name, block_size, key_size, rounds)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Запись через временный файл: параллельные процессы не увидят недописанный кэш
+    tmp_path = f"{path[:-len('.npz')]}.{os.getpid()}.tmp.npz"
+    schedule.save(tmp_path)
+    os.replace(tmp_path, path)
+    return schedule
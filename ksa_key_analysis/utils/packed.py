@@ -0,0 +1,128 @@
+import json
+import os
+import struct
+import numpy as np
+from utils.bitcodec import (KEY_BITORDER, ROUND_KEY_BITORDER, pack_key_bits, pack_round_key_bits,
+                            unpack_key_bits, unpack_round_key_bits)
+
+# Упакованный формат датасета (.packed), без сжатия, пригоден для np.memmap:
+#
+#   [0:8]     MAGIC
+#   [8:12]    длина JSON-заголовка (uint32, little-endian)
+#   [12:...]  JSON-заголовок, дополненный пробелами до HEADER_SIZE байт
+#   [HEADER_SIZE:]  num_samples записей по record_size байт
+#
+# Запись - поля подряд, каждое упаковано np.packbits: keys (bitorder='big',
+# как pack_key_bits) и last_round_keys (bitorder='little', как pack_round_key_bits).
+# Описание полей (смещение, число байт и бит, порядок бит) хранится в заголовке.
+
+MAGIC = b'KSAPACK1'
+HEADER_SIZE = 4096
+PACKED_EXT = '.packed'
+FORMAT_VERSION = 1
+
+_PACKERS = {
+    KEY_BITORDER: (pack_key_bits, unpack_key_bits),
+    ROUND_KEY_BITORDER: (pack_round_key_bits, unpack_round_key_bits),
+}
+
+
+def make_header(spec, capacity, key_bits, round_key_bits):
+    """Заголовок нового упакованного датасета (пока без записей)."""
+    fields = []
+    offset = 0
+    for name, bits, bitorder in (('keys', key_bits, KEY_BITORDER),
+                                 ('last_round_keys', round_key_bits, ROUND_KEY_BITORDER)):
+        size = -(-bits // 8)
+        fields.append({'name': name, 'offset': offset, 'bytes': size, 'bits': bits, 'bitorder': bitorder})
+        offset += size
+    header = {
+        'version': FORMAT_VERSION,
+        'cipher': spec.cipher,
+        'block_size': spec.block_size,
+        'key_size': spec.key_size,
+        'rounds': spec.rounds,
+        'sboxes': spec.sboxes,
+        'capacity': capacity,
+        'num_samples': 0,
+        'complete': False,
+        'record_size': offset,
+        'fields': fields,
+    }
+    if spec.trajectory:
+        # last_round_keys - ключи этих раундов подряд
+        header['trajectory'] = list(spec.trajectory)
+    return header
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        prefix = f.read(12)
+        if len(prefix) < 12 or prefix[:8] != MAGIC:
+            raise ValueError(f"{path} is not a packed dataset")
+        (length,) = struct.unpack('<I', prefix[8:])
+        return json.loads(f.read(length).decode('utf-8'))
+
+
+def write_header(f, header):
+    body = json.dumps(header).encode('utf-8')
+    if 12 + len(body) > HEADER_SIZE:
+        raise ValueError("Packed dataset header is too large")
+    f.seek(0)
+    f.write(MAGIC + struct.pack('<I', len(body)) + body.ljust(HEADER_SIZE - 12, b' '))
+
+
+def pack_records(header, **arrays):
+    """Упаковка матриц битов полей в массив записей (N, record_size)."""
+    num_samples = len(next(iter(arrays.values())))
+    records = np.empty((num_samples, header['record_size']), dtype=np.uint8)
+    for field in header['fields']:
+        pack, _ = _PACKERS[field['bitorder']]
+        records[:, field['offset']:field['offset'] + field['bytes']] = pack(arrays[field['name']])
+    return records
+
+
+class PackedDataset:
+    """
+    Чтение упакованного датасета: записи отображаются в память (np.memmap),
+    распаковываются только запрошенные строки.
+    """
+
+    def __init__(self, path, allow_incomplete=False):
+        self.path = path
+        self.header = read_header(path)
+        if self.header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported packed dataset version in {path}")
+        if not self.header['complete'] and not allow_incomplete:
+            raise ValueError(f"Packed dataset {path} is incomplete")
+        self.num_samples = self.header['num_samples']
+        self.fields = {field['name']: field for field in self.header['fields']}
+        record_size = self.header['record_size']
+        if os.path.getsize(path) < HEADER_SIZE + self.num_samples * record_size:
+            raise ValueError(f"Packed dataset {path} is truncated")
+        self.records = (np.memmap(path, dtype=np.uint8, mode='r', offset=HEADER_SIZE,
+                                  shape=(self.num_samples, record_size))
+                        if self.num_samples else np.zeros((0, record_size), dtype=np.uint8))
+
+    def __len__(self):
+        return self.num_samples
+
+    def num_bits(self, name):
+        return self.fields[name]['bits']
+
+    def packed(self, name, rows):
+        """Упакованные байты поля name для строк rows (срез или массив индексов)."""
+        field = self.fields[name]
+        return self.records[rows, field['offset']:field['offset'] + field['bytes']]
+
+    def unpack(self, name, rows):
+        """Матрица битов поля name для строк rows (срез или массив индексов)."""
+        field = self.fields[name]
+        _, unpack = _PACKERS[field['bitorder']]
+        return unpack(np.asarray(self.packed(name, rows)), field['bits'])
+
+    def keys(self, start=0, stop=None):
+        return self.unpack('keys', slice(start, stop))
+
+    def last_round_keys(self, start=0, stop=None):
+        return self.unpack('last_round_keys', slice(start, stop))
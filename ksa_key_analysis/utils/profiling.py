@@ -0,0 +1,164 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows: пиковый RSS не измеряется
+    resource = None
+
+# Профилирование этапов (генерация ключей, запись, загрузка данных, построение модели,
+# обучение, предсказание). Код библиотеки вызывает span(...) активного профилировщика;
+# пока профилирование не включено (start), span возвращает общий пустой контекст.
+
+# Событий, сохраняемых в трассе целиком; остальные учитываются только в сводке по этапам
+MAX_EVENTS = 10000
+
+_NULL_SPAN = nullcontext()
+
+
+def current_rss_mb():
+    """Текущий RSS процесса (МБ, /proc/self/statm) или None, если не поддерживается."""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+
+
+def peak_rss_mb():
+    """
+    Пиковый RSS процесса (МБ) за все время его работы (ru_maxrss) или None, если не поддерживается.
+    Не убывает: для оценки памяти отдельного этапа - current_rss_mb в начале и конце этапа.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux - килобайты, macOS - байты
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def children_peak_rss_mb():
+    """Наибольший пиковый RSS завершенных дочерних процессов (МБ) или None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+class Profiler:
+    """
+    Трасса одного запуска: интервалы этапов (начало, длительность, текущий RSS в начале
+    и в конце, пиковый RSS процесса к концу этапа) и сводка по этапам (число, суммарное
+    и наибольшее время, наибольший прирост RSS).
+    """
+
+    def __init__(self, name, enabled=True):
+        self.name = name
+        self.enabled = enabled
+        self.created = datetime.now()
+        self.origin = time.perf_counter()
+        self.events = []
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def span(self, stage, **attrs):
+        """Контекст этапа stage; attrs (например, число примеров) сохраняются в событии."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(stage, attrs)
+
+    @contextmanager
+    def _span(self, stage, attrs):
+        rss_start = current_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, start, time.perf_counter(), rss_start, **attrs)
+
+    def record(self, stage, start, end, rss_start_mb=None, **attrs):
+        """Интервал [start, end) (time.perf_counter) этапа stage; rss_start_mb - RSS в начале этапа."""
+        seconds = end - start
+        rss_end = current_rss_mb()
+        peak = peak_rss_mb()
+        # Этапы чтения данных выполняются и в потоках tf.data
+        with self._lock:
+            summary = self.stages.setdefault(stage, {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            summary['count'] += 1
+            summary['seconds'] += seconds
+            summary['max_seconds'] = max(summary['max_seconds'], seconds)
+            if rss_start_mb is not None and rss_end is not None:
+                summary['max_rss_growth_mb'] = max(summary.get('max_rss_growth_mb', 0.0), rss_end - rss_start_mb)
+            if len(self.events) < MAX_EVENTS:
+                self.events.append(dict(stage=stage, start=start - self.origin, seconds=seconds,
+                                        rss_start_mb=rss_start_mb, rss_end_mb=rss_end, peak_rss_mb=peak,
+                                        thread=threading.current_thread().name, **attrs))
+
+    def trace(self):
+        return {
+            'run': self.name,
+            'created': self.created.isoformat(timespec='seconds'),
+            'argv': sys.argv,
+            'wall_seconds': time.perf_counter() - self.origin,
+            'peak_rss_mb': peak_rss_mb(),
+            'children_peak_rss_mb': children_peak_rss_mb(),
+            'stages': self.stages,
+            'events': self.events,
+            'events_dropped': sum(stage['count'] for stage in self.stages.values()) - len(self.events),
+        }
+
+    def save(self, directory):
+        """
+        Трасса в JSON-файл trace_<run>_<время запуска>.json каталога directory.
+        :return: путь к файлу (None, если профилирование выключено)
+        """
+        if not self.enabled:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"trace_{self.name}_{self.created:%Y%m%d-%H%M%S}.json")
+        with open(path, "w") as f:
+            json.dump(self.trace(), f, indent=2)
+        return path
+
+    def finish(self, directory):
+        """Вывод сводки и сохранение трассы в directory (если профилирование включено)."""
+        path = self.save(directory)
+        if path is not None:
+            self.print_summary()
+            print(f"Трасса сохранена в {path}")
+        return path
+
+    def print_summary(self):
+        print("\nЭтапы (суммарное время):")
+        for stage, summary in sorted(self.stages.items(), key=lambda item: -item[1]['seconds']):
+            growth = summary.get('max_rss_growth_mb')
+            growth = f"  RSS +{growth:.0f} МБ" if growth is not None else ""
+            print(f"{stage:24s} {summary['seconds']:9.3f} с  x{summary['count']}{growth}")
+        rss = peak_rss_mb()
+        if rss is not None:
+            print(f"Пиковый RSS процесса: {rss:.0f} МБ")
+
+
+_active = Profiler(None, enabled=False)
+
+
+def start(name, enabled=True):
+    """Новый активный профилировщик запуска name (при enabled=False все интервалы пустые)."""
+    global _active
+    _active = Profiler(name, enabled)
+    return _active
+
+
+def active():
+    return _active
+
+
+def span(stage, **attrs):
+    """Интервал этапа stage активного профилировщика."""
+    return _active.span(stage, **attrs)
@@ -1,4 +1,5 @@
 import numpy as np
+from utils.bitcodec import bits_to_words, words_to_bits
 
 class RectangleCipher:
     # S-box для RECTANGLE
@@ -14,6 +15,9 @@ class RectangleCipher:
         self.key_size = key_size
         self.rounds = rounds if rounds is not None else 25
         self.block_size = block_size
+        # Round constants и таблица S-box вычисляются один раз на экземпляр
+        self.round_constants = self._generate_round_constants()
+        self.sbox_table = self._generate_sbox_table()
         
     def _apply_sbox(self, word):
         """Применение S-box к 4-битному слову"""
@@ -98,13 +102,29 @@ class RectangleCipher:
     
         return new_state
     
-    def _generate_round_constants(self):
+    def _generate_round_constants(self, count=None):
         """Генерация round constants (5-битный LFSR)"""
+        count = count if count is not None else self.rounds
         rc = [0x01]  # Начальное значение
-        for _ in range(1, self.rounds):
+        for _ in range(1, count):
             new_bit = (rc[-1] >> 4) ^ (rc[-1] >> 2)
             rc.append(((rc[-1] << 1) | (new_bit & 1)) & 0x1F)
         return rc
+
+    def _get_round_constants(self, num_rounds):
+        """Round constants для num_rounds раундов (кэш продлевается при необходимости)"""
+        if num_rounds > len(self.round_constants):
+            self.round_constants = self._generate_round_constants(num_rounds)
+        return self.round_constants
+
+    def _generate_sbox_table(self):
+        """Таблица S-box для 16-битного слова: S-box применяется к каждому из 4 nibble"""
+        values = np.arange(1 << 16, dtype=np.uint32)
+        sbox = np.array(self.SBOX, dtype=np.uint32)
+        table = np.zeros(1 << 16, dtype=np.uint32)
+        for j in range(4):
+            table |= sbox[(values >> (4*j)) & 0xF] << (4*j)
+        return table.astype(np.uint16)
     
     def generate_round_keys(self, master_key, rounds=None):
         """
@@ -114,7 +134,7 @@ class RectangleCipher:
         :return: список 64-битных раундовых ключей
         """
         num_rounds = rounds if rounds is not None else self.rounds
-        round_constants = self._generate_round_constants()
+        round_constants = self._get_round_constants(num_rounds)
         round_keys = []
         
         if self.key_size == 80:
@@ -152,3 +172,61 @@ class RectangleCipher:
                     key_state = self._key_update_128bit(key_state, round_constants[r])
         
         return round_keys
+
+    def _key_update_80bit_batch(self, rows, round_const):
+        """Пакетный вариант _key_update_80bit: rows - список из 5 массивов uint16"""
+        s0, s1, s2, s3 = (self.sbox_table[row] for row in rows[:4])
+        row0 = ((s0 << np.uint16(8)) | (s0 >> np.uint16(8))) ^ s1
+        row3 = ((s3 << np.uint16(12)) | (s3 >> np.uint16(4))) ^ rows[4]
+        row0 ^= np.uint16((round_const & 0x1F) << 11)
+        return [row0, s2, s3, row3, s0]
+
+    def _key_update_128bit_batch(self, rows, round_const):
+        """Пакетный вариант _key_update_128bit: rows - список из 4 массивов uint32"""
+        s0, s1, s2, s3 = (
+            self.sbox_table[row & 0xFFFF].astype(np.uint32)
+            | (self.sbox_table[row >> 16].astype(np.uint32) << np.uint32(16))
+            for row in rows
+        )
+        row0 = ((s0 << np.uint32(8)) | (s0 >> np.uint32(24))) ^ s1
+        row2 = ((s2 << np.uint32(16)) | (s2 >> np.uint32(16))) ^ s3
+        row0 ^= np.uint32((round_const & 0x1F) << 27)
+        return [row0, s2, row2, s0]
+
+    def generate_round_keys_batch(self, key_bits, rounds=None, all_rounds=False):
+        """
+        Пакетная генерация раундовых ключей: состояние хранится строками
+        (массивы uint16 для 80-битного ключа, uint32 для 128-битного).
+        :param key_bits: массив (N, key_size) uint8, столбец 0 - старший бит ключа
+        :param rounds: количество раундов (если None - используется self.rounds)
+        :param all_rounds: вернуть все раундовые ключи, а не только последний
+        :return: (N, block_size) или (N, rounds + 1, block_size) uint8, бит j раундового ключа в столбце j
+        """
+        num_rounds = rounds if rounds is not None else self.rounds
+        round_constants = self._get_round_constants(num_rounds)
+
+        if self.key_size == 80:
+            words = bits_to_words(key_bits, 16).astype(np.uint16)
+            rows = [words[:, i] for i in range(4, -1, -1)]
+            key_update = self._key_update_80bit_batch
+        else:
+            words = bits_to_words(key_bits, 32).astype(np.uint32)
+            rows = [words[:, i] for i in range(3, -1, -1)]
+            key_update = self._key_update_128bit_batch
+
+        round_keys = []
+        for r in range(num_rounds + 1):
+            if all_rounds or r == num_rounds:
+                # Раундовый ключ - младшие 16 бит строк 0-3
+                round_keys.append(
+                    ((rows[3].astype(np.uint64) & 0xFFFF) << np.uint64(48))
+                    | ((rows[2].astype(np.uint64) & 0xFFFF) << np.uint64(32))
+                    | ((rows[1].astype(np.uint64) & 0xFFFF) << np.uint64(16))
+                    | (rows[0].astype(np.uint64) & 0xFFFF)
+                )
+            if r < num_rounds:
+                rows = key_update(rows, round_constants[r])
+
+        if all_rounds:
+            return words_to_bits(np.stack(round_keys, axis=1), self.block_size)
+        return words_to_bits(round_keys[-1], self.block_size)
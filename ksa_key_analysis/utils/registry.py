@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка реестра не поддерживается
+    fcntl = None
+
+REGISTRY_FILE = "data/registry.json"
+CHECKSUM_BLOCK_SIZE = 16 << 20
+
+
+def file_checksum(path):
+    """SHA-256 файла (читается блоками)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHECKSUM_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def spec_fields(spec):
+    """
+    Поля конфигурации для JSON. Поле trajectory есть только у датасетов-траекторий:
+    адреса и записи обычных датасетов не зависят от его появления в DatasetSpec.
+    """
+    fields = spec._asdict()
+    if fields.get('trajectory'):
+        fields['trajectory'] = list(fields['trajectory'])
+    else:
+        fields.pop('trajectory', None)
+    return fields
+
+
+def config_digest(spec, entropy):
+    """
+    Адрес содержимого датасета: при детерминированной генерации шардами датасет
+    полностью определяется конфигурацией, seed и числом примеров (меньший - префикс большего).
+    """
+    config = dict(spec_fields(spec), seed=str(entropy))
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class DatasetRegistry:
+    """
+    Реестр сгенерированных датасетов (data/registry.json): для каждого адреса
+    config_digest хранятся конфигурация, seed, путь, число примеров и контрольная сумма.
+    """
+
+    def __init__(self, path=REGISTRY_FILE):
+        self.path = path
+
+    @contextmanager
+    def _locked(self):
+        """Монопольный доступ к реестру (для параллельных запусков генерации)."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, entries):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, spec, path, seed=None):
+        """
+        Запись о датасете конфигурации spec в файле path (с данным seed, если он задан).
+        :return: словарь записи или None
+        """
+        with self._locked():
+            entries = self._read()
+        for entry in entries.values():
+            if (entry['path'] == path and entry['spec'] == list(spec_fields(spec).values())
+                    and (seed is None or entry['seed'] == str(seed))):
+                return entry
+        return None
+
+    def record(self, spec, entropy, path, num_samples):
+        """Регистрация (или обновление) датасета после генерации/дополнения."""
+        entry = {
+            'spec': list(spec_fields(spec).values()),
+            'seed': str(entropy),
+            'path': path,
+            'num_samples': num_samples,
+            'size': os.path.getsize(path),
+            'sha256': file_checksum(path),
+            'mtime_ns': os.stat(path).st_mtime_ns,
+        }
+        with self._locked():
+            entries = self._read()
+            # Файл перезаписан: записи о прежнем содержимом недействительны
+            entries = {key: value for key, value in entries.items() if value['path'] != path}
+            entries[config_digest(spec, entropy)] = entry
+            self._write(entries)
+        return entry
+
+    def verify(self, entry, full=False):
+        """
+        Файл существует и совпадает с записью. Быстрая проверка - размер и время изменения;
+        SHA-256 пересчитывается, только если время изменения другое (или не записано) либо full.
+        Если контрольная сумма совпала, в записи сохраняется новое время изменения.
+        """
+        path = entry['path']
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != entry['size']:
+            return False
+        if not full and entry.get('mtime_ns') == stat.st_mtime_ns:
+            return True
+        if file_checksum(path) != entry['sha256']:
+            return False
+        if entry.get('mtime_ns') != stat.st_mtime_ns:
+            with self._locked():
+                entries = self._read()
+                for value in entries.values():
+                    if value['path'] == path and value['sha256'] == entry['sha256']:
+                        value['mtime_ns'] = stat.st_mtime_ns
+                self._write(entries)
+        return True
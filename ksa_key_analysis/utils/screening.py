@@ -0,0 +1,132 @@
+import numpy as np
+from utils.stats import chi2_pvalues
+
+# Скрининг зависимости битов мастер-ключа от битов последнего раундового ключа до обучения:
+# взаимная информация, корреляция и G-критерий по таблицам сопряженности, которые
+# считаются умножением матриц (бит ключа)^T x (one-hot значения группы бит раундового ключа).
+
+# Примеров в одном блоке подсчета: счетчики блока в float32 точны (< 2^24)
+SCREEN_CHUNK = 1 << 16
+
+# Наибольший размер one-hot матрицы блока (элементов float32, 64 МБ): для широких групп блок уменьшается
+ONEHOT_BUDGET = 1 << 24
+
+# Группы больше 8 бит дают слишком широкие таблицы сопряженности
+MAX_GROUP_SIZE = 8
+
+
+def group_values(round_keys, group_size):
+    """
+    Значения групп из group_size соседних бит раундового ключа (бит j группы g - столбец
+    g * group_size + j, младший бит первым); неполная последняя группа отбрасывается.
+    :return: массив (N, n // group_size) int64
+    """
+    groups = round_keys.shape[1] // group_size
+    bits = round_keys[:, :groups * group_size].reshape(len(round_keys), groups, group_size)
+    return bits.astype(np.int64) @ (1 << np.arange(group_size, dtype=np.int64))
+
+
+def contingency_counts(dataset, group_size=1, start=0, stop=None, chunk=None):
+    """
+    Таблицы сопряженности бит ключа и групп бит раундового ключа по примерам [start, stop)
+    датасета utils.storage.open_dataset (читается блоками по chunk примеров; по умолчанию
+    SCREEN_CHUNK, но так, чтобы one-hot блока не превышала ONEHOT_BUDGET элементов).
+    :return: (ones, totals, N): ones[i, g, v] - число примеров с битом ключа i = 1 и значением
+             группы g, равным v; totals[g, v] - число примеров со значением v группы g
+    """
+    if not 1 <= group_size <= MAX_GROUP_SIZE:
+        raise ValueError(f"Group size must be between 1 and {MAX_GROUP_SIZE}, got {group_size}")
+    stop = len(dataset) if stop is None else min(stop, len(dataset))
+    levels = 1 << group_size
+    if chunk is None:
+        columns = dataset.num_bits('last_round_keys') // group_size * levels
+        chunk = min(SCREEN_CHUNK, max(1, ONEHOT_BUDGET // columns))
+    ones, totals = None, None
+    for begin in range(start, stop, chunk):
+        rows = slice(begin, min(begin + chunk, stop))
+        keys = dataset.unpack('keys', rows).astype(np.float32)
+        values = group_values(dataset.unpack('last_round_keys', rows), group_size)
+        onehot = np.zeros((len(values), values.shape[1] * levels), dtype=np.float32)
+        onehot[np.arange(len(values))[:, None], np.arange(values.shape[1]) * levels + values] = 1
+        chunk_ones = (keys.T @ onehot).astype(np.int64)
+        chunk_totals = np.count_nonzero(onehot, axis=0)
+        ones = chunk_ones if ones is None else ones + chunk_ones
+        totals = chunk_totals if totals is None else totals + chunk_totals
+    if ones is None:
+        raise ValueError("No samples to screen")
+    return ones.reshape(len(ones), -1, levels), totals.reshape(-1, levels), stop - start
+
+
+def _xlogy(x, y):
+    return np.where(x > 0, x * np.log(np.where(x > 0, y, 1)), 0.0)
+
+
+def screen_counts(ones, totals, total, alpha=0.01):
+    """
+    Статистика пар (бит ключа i, группа g) по таблицам contingency_counts:
+    * mutual_information - эмпирическая взаимная информация (биты);
+    * correlation - корреляция Пирсона бита ключа и четности (XOR) бит группы
+      (для групп из одного бита - корреляция бит);
+    * p_value - G-критерий независимости (G = 2 N MI в натах, хи-квадрат с 2^size - 1 степенями свободы);
+    * significant - p_value ниже alpha с поправкой Бонферрони на число пар.
+    :return: словарь массивов (key_bits, groups) и порог p-значения
+    """
+    ones = ones.astype(np.float64)
+    totals = totals.astype(np.float64)
+    levels = totals.shape[1]
+    key_ones = ones[:, 0, :].sum(axis=1)                            # (K,) - одинаково для всех групп
+    joint = np.stack([totals[None] - ones, ones], axis=-1) / total  # (K, G, V, 2)
+    key_marginal = np.stack([total - key_ones, key_ones], axis=-1) / total
+    group_marginal = totals / total
+    expected = group_marginal[None, :, :, None] * key_marginal[:, None, None, :]
+    mutual_information = _xlogy(joint, joint / np.where(expected > 0, expected, 1)).sum(axis=(2, 3))
+    pvalues = chi2_pvalues(2 * total * mutual_information, levels - 1)
+
+    odd = np.array([bin(v).count('1') & 1 for v in range(levels)], dtype=bool)
+    both = ones[:, :, odd].sum(axis=2)
+    parity = totals[:, odd].sum(axis=1)
+    denominator = np.sqrt(key_ones * (total - key_ones))[:, None] * np.sqrt(parity * (total - parity))[None]
+    correlation = np.divide(both * total - key_ones[:, None] * parity[None], denominator,
+                            out=np.zeros_like(both), where=denominator > 0)
+
+    threshold = alpha / pvalues.size
+    return {
+        'mutual_information': mutual_information / np.log(2),
+        'correlation': correlation,
+        'p_value': pvalues,
+        'significant': pvalues < threshold,
+        'threshold': threshold,
+    }
+
+
+def screen_dataset(dataset, group_size=1, alpha=0.01, max_samples=None):
+    """
+    Скрининг датасета: для каждого бита ключа - наиболее зависимая группа бит раундового ключа.
+    :return: словарь: сводка (число значимых бит, рекомендация обучать) и массивы по битам ключа
+    """
+    stop = None if max_samples is None else max_samples
+    ones, totals, total = contingency_counts(dataset, group_size, stop=stop)
+    pairs = screen_counts(ones, totals, total, alpha)
+    best = pairs['p_value'].argmin(axis=1)
+    rows = np.arange(len(best))
+    flagged = pairs['significant'].any(axis=1)
+    return {
+        'samples': int(total),
+        'key_bits': len(best),
+        'group_size': group_size,
+        'groups': totals.shape[0],
+        'alpha': alpha,
+        'p_threshold': pairs['threshold'],
+        'significant_pairs': int(pairs['significant'].sum()),
+        'flagged_bits': np.flatnonzero(flagged).tolist(),
+        'max_mutual_information': float(pairs['mutual_information'].max()),
+        'worth_training': bool(flagged.any()),
+        'bits': {
+            'best_group': best,
+            'mutual_information': pairs['mutual_information'][rows, best],
+            'correlation': pairs['correlation'][rows, best],
+            'max_abs_correlation': np.abs(pairs['correlation']).max(axis=1),
+            'p_value': pairs['p_value'][rows, best],
+            'flagged': flagged,
+        },
+    }
@@ -1,4 +1,6 @@
 import numpy as np
+from utils.bitcodec import bits_to_words, words_to_bits
+
 class SimonCipher:
     z0 = 0b01100111000011010100100010111110110011100001101010010001011111
     z1 = 0b01011010000110010011111011100010101101000011001001111101110001
@@ -49,8 +51,10 @@ class SimonCipher:
     def generate_round_keys(self, master_key, rounds):
         """
         :param master_key: The master key as an integer.
+        :param rounds: number of rounds (None for self.rounds).
         :return: List of round keys as integers.
         """
+        num_rounds = rounds if rounds is not None else self.rounds
         words = []
         for i in range(self.num_words):
             word = (master_key >> (i * self.word_size)) & self.mod_mask
@@ -59,7 +63,7 @@ class SimonCipher:
         round_keys = words.copy()
         round_constant = self.mod_mask ^ 3  # 0xFFFF...FC
 
-        for i in range(self.num_words, self.rounds):
+        for i in range(self.num_words, num_rounds):
             # Вычисляем новое слово (аналогично эталонной реализации)
             z_bit = (self.z_sequence >> ((i - self.num_words) % 62)) & 1
             tmp = (words[i - 1] >> 3) | ((words[i - 1] << (self.word_size - 3)) & self.mod_mask)
@@ -72,3 +76,36 @@ class SimonCipher:
 
         return round_keys
 
+    def generate_round_keys_batch(self, key_bits, rounds=None, all_rounds=False):
+        """
+        Пакетное расширение ключа для массива мастер-ключей.
+        :param key_bits: массив (N, key_size) uint8, столбец 0 - старший бит ключа
+        :param rounds: число раундов (None для self.rounds)
+        :param all_rounds: вернуть все раундовые ключи, а не только последний
+        :return: (N, word_size) или (N, R, word_size) uint8, бит j раундового ключа в столбце j
+        """
+        num_rounds = rounds if rounds is not None else self.rounds
+        n = self.word_size
+        mask = np.uint64(self.mod_mask)
+        shift_right = np.uint64(3)
+        shift_left = np.uint64(n - 3)
+        one = np.uint64(1)
+
+        # Храним только последние m слов (как words[i - m .. i - 1] в generate_round_keys)
+        words = list(bits_to_words(key_bits, n).T)
+        history = list(words) if all_rounds else None
+
+        for i in range(self.num_words, num_rounds):
+            z_bit = np.uint64((self.z_sequence >> ((i - self.num_words) % 62)) & 1)
+            tmp = (words[-1] >> shift_right) | ((words[-1] << shift_left) & mask)
+            if self.num_words == 4:
+                tmp ^= words[-3]
+            tmp ^= (tmp >> one)
+            new_word = z_bit ^ tmp ^ words[0]
+            words = words[1:] + [new_word]
+            if all_rounds:
+                history.append(new_word)
+
+        if all_rounds:
+            return words_to_bits(np.stack(history, axis=1), n)
+        return words_to_bits(words[-1], n)
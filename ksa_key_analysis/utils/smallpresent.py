@@ -1,40 +1,112 @@
 import numpy as np
+from utils.bitcodec import bits_to_words, words_to_bits
 
 class SmallPresent:
-    def __init__(self, block_size):
+    # Позиции (младший бит) nibble, к которым применяются S-box.
+    # Вариант с k S-box использует первые k позиций.
+    SBOX_POSITIONS = (
+        76,  # S-box №1 for bits 76-79
+        0,   # S-box №2 for bits 0-3
+        15,  # S-box №3 for bits 15-18
+        20,  # S-box №4 for bits 20-23
+        61,  # S-box №5 for bits 61-64
+    )
+
+    def __init__(self, block_size, sbox_count=1):
+        """
+        :param block_size: длина раундового ключа (8, 16, 32, 48, 64)
+        :param sbox_count: число S-box в АРК (1-5)
+        """
+        if not 1 <= sbox_count <= len(self.SBOX_POSITIONS):
+            raise ValueError(f"Unsupported S-box count: {sbox_count}")
         self.block_size = block_size
+        self.sbox_count = sbox_count
         self.sbox = self._generate_sbox()
-    
+        self.sbox_table = np.array(self.sbox, dtype=np.uint64)
+
     def _generate_sbox(self):
         # Фиксированный 4-битный S-box для всех размеров блоков
         return [0xC, 0x5, 0x6, 0xB, 0x9, 0x0, 0xA, 0xD,
                 0x3, 0xE, 0xF, 0x8, 0x4, 0x7, 0x1, 0x2]
-                   
+
     def generate_round_keys(self, master_key, rounds):
         """Генерация раундовых ключей для SmallPresent"""
         key = master_key
         round_keys = []
-        
+        positions = self.SBOX_POSITIONS[:self.sbox_count]
+
         for i in range(1, rounds+1):
             # Берем младшие block_size бит в качестве раундового ключа
             round_key = key & ((1 << self.block_size) - 1)
             round_keys.append(round_key)
-           
+
             key = ((key & 0x7FFFF) << 61) | (key >> 19)
-            
+
             """Модуль модификации АРК относительно количества S-box"""
-            sbox_high = self.sbox[(key >> 76) & 0xF]  # S-box №1 for bits 76-79
-            #sbox_mid1  = self.sbox[(key >> 15) & 0xF] # S-box №2 for bits 15-18
-            #sbox_low = self.sbox[key & 0xF] #S-box №3 for bits 20-23
-            #sbox_mid2 = self.sbox[(key>>20) & 0xF] # S-box №4 for bits 61-64
-            #sbox_mid3 = self.sbox[(key>>61) & 0xF] # S-box №5 for bits 76-79
-            
-            key = (sbox_high << 76) | (key & 0x0FFFFFFFFFFFFFFFFFFF) # having 1 (№1) S-box
-            #key = (sbox_high << 76) | (key & 0x0FFFFFFFFFFFFFFFFFF0) | sbox_low # having 2 (№1,2) S-box
-            #key = (sbox_high << 76) | (sbox_mid << 15) | sbox_low | (key & 0x0FFFFFFFFFFFFFF87FF0) # having 3 (№1,2,3) S-box
-            #key = (sbox_high << 76) | (sbox_mid2 << 20) | (sbox_mid1 << 15) | sbox_low | (key & 0x0FFFFFFFFFFFFF087FF0) # having 4 (№1,2,3,4) S-box
-            #key = (sbox_high << 76) | (sbox_mid3 << 61)| (sbox_mid2 << 20) | (sbox_mid1 << 15) | sbox_low | (key & 0x0FFE1FFFFFFFFF087FF0) # having 5 (№1,2,3,4) S-box
+            # Все S-box берут вход из ключа после сдвига
+            substituted = [self.sbox[(key >> pos) & 0xF] for pos in positions]
+            for pos, value in zip(positions, substituted):
+                key = (key & ~(0xF << pos)) | (value << pos)
             key ^= i << 15
         return round_keys
-    
- 
+
+    @staticmethod
+    def _get_nibble(lo, hi, pos):
+        """Nibble с позиции pos 80-битного ключа, заданного парой (lo: 64 бит, hi: 16 бит)."""
+        if pos >= 64:
+            return (hi >> np.uint64(pos - 64)) & np.uint64(0xF)
+        if pos + 4 <= 64:
+            return (lo >> np.uint64(pos)) & np.uint64(0xF)
+        low_bits = 64 - pos
+        return (lo >> np.uint64(pos)) | ((hi << np.uint64(low_bits)) & np.uint64(0xF))
+
+    @staticmethod
+    def _set_nibble(lo, hi, pos, value):
+        """Запись nibble value на позицию pos в пару (lo, hi)."""
+        nibble = np.uint64(0xF)
+        if pos >= 64:
+            shift = np.uint64(pos - 64)
+            return lo, (hi & ~(nibble << shift)) | (value << shift)
+        shift = np.uint64(pos)
+        lo = (lo & ~(nibble << shift)) | (value << shift)
+        if pos + 4 > 64:
+            low_bits = np.uint64(64 - pos)
+            high_mask = np.uint64((1 << (pos + 4 - 64)) - 1)
+            hi = (hi & ~high_mask) | (value >> low_bits)
+        return lo, hi
+
+    def generate_round_keys_batch(self, key_bits, rounds, all_rounds=False):
+        """
+        Пакетная генерация раундовых ключей.
+        80-битный ключ хранится двумя массивами: lo (биты 0-63) и hi (биты 64-79).
+        :param key_bits: массив (N, 80) uint8, столбец 0 - старший бит ключа
+        :param rounds: число раундов
+        :param all_rounds: вернуть все раундовые ключи, а не только последний
+        :return: (N, block_size) или (N, rounds, block_size) uint8, бит j раундового ключа в столбце j
+        """
+        words = bits_to_words(key_bits, 16)
+        lo = words[:, 0] | (words[:, 1] << np.uint64(16)) | (words[:, 2] << np.uint64(32)) | (words[:, 3] << np.uint64(48))
+        hi = words[:, 4]
+        block_mask = np.uint64((1 << self.block_size) - 1)
+        positions = self.SBOX_POSITIONS[:self.sbox_count]
+        history = []
+
+        for i in range(1, rounds + 1):
+            round_key = lo & block_mask
+            if all_rounds or i == rounds:
+                history.append(round_key)
+            if i == rounds:
+                break
+
+            # Циклический сдвиг 80-битного ключа на 61 бит влево
+            lo, hi = ((lo >> np.uint64(19)) | (hi << np.uint64(45)) | (lo << np.uint64(61)),
+                      (lo >> np.uint64(3)) & np.uint64(0xFFFF))
+
+            substituted = [self.sbox_table[self._get_nibble(lo, hi, pos)] for pos in positions]
+            for pos, value in zip(positions, substituted):
+                lo, hi = self._set_nibble(lo, hi, pos, value)
+            lo ^= np.uint64(i << 15)
+
+        if all_rounds:
+            return words_to_bits(np.stack(history, axis=1), self.block_size)
+        return words_to_bits(history[-1], self.block_size)
@@ -1,4 +1,6 @@
 import numpy as np
+from utils.bitcodec import bits_to_words, words_to_bits
+
 class SpeckCipher:
     """Реализация шифра SPECK с корректным расширением ключа."""
     
@@ -52,6 +54,7 @@ class SpeckCipher:
 
     def generate_round_keys(self, master_key, rounds):
         """Генерация раундовых ключей по мастер-ключу."""
+        num_rounds = rounds if rounds is not None else self.rounds
         # Разбиваем ключ на слова (l[m-2], ..., l[0], k[0])
         words = []
         for i in range(self.m):
@@ -60,7 +63,7 @@ class SpeckCipher:
         k = [words.pop()]  # k[0] - последнее слово
         l = words[::-1]    # l[0..m-2]
         
-        for i in range(self.rounds - 1):
+        for i in range(num_rounds - 1):
             # l[i+m-1] = (k[i] + S^-α(l[i])) ⊕ i
             new_l = ((k[i] + self._rotate_right(l[i], self.alpha)) & self.mod_mask) ^ i
             # k[i+1] = S^β(k[i]) ⊕ l[i+m-1]
@@ -70,3 +73,37 @@ class SpeckCipher:
             k.append(new_k)
         
         return k
+
+    def generate_round_keys_batch(self, key_bits, rounds=None, all_rounds=False):
+        """
+        Пакетная генерация раундовых ключей для массива мастер-ключей.
+        Хранится только текущее состояние (k[i] и очередь из m-1 слов l),
+        сложение по модулю 2^n выполняется в uint64 (для n = 64 перенос
+        отбрасывается переполнением uint64).
+        :param key_bits: массив (N, key_size) uint8, столбец 0 - старший бит ключа
+        :param rounds: число раундов (None для self.rounds)
+        :param all_rounds: вернуть все раундовые ключи, а не только последний
+        :return: (N, word_size) или (N, R, word_size) uint8, бит j раундового ключа в столбце j
+        """
+        num_rounds = rounds if rounds is not None else self.rounds
+        n = self.word_size
+        mask = np.uint64(self.mod_mask)
+        alpha, beta = np.uint64(self.alpha), np.uint64(self.beta)
+        alpha_inv, beta_inv = np.uint64(n - self.alpha), np.uint64(n - self.beta)
+
+        words = bits_to_words(key_bits, n)
+        k = words[:, -1].copy()                               # k[0]
+        l = [words[:, j] for j in range(self.m - 2, -1, -1)]  # l[0..m-2]
+        history = [k] if all_rounds else None
+
+        for i in range(num_rounds - 1):
+            rotated = ((l[0] >> alpha) | (l[0] << alpha_inv)) & mask
+            new_l = ((k + rotated) & mask) ^ np.uint64(i)
+            k = (((k << beta) | (k >> beta_inv)) & mask) ^ new_l
+            l = l[1:] + [new_l]
+            if all_rounds:
+                history.append(k)
+
+        if all_rounds:
+            return words_to_bits(np.stack(history, axis=1), n)
+        return words_to_bits(k, n)
@@ -0,0 +1,175 @@
+import csv
+import json
+import math
+from statistics import NormalDist
+import numpy as np
+
+try:
+    from scipy.special import erfc as _scipy_erfc
+except ImportError:  # scipy не обязателен: используется приближение на NumPy
+    _scipy_erfc = None
+
+# Методы доверительных интервалов для точности битов
+CI_METHODS = ('wilson', 'bootstrap')
+BOOTSTRAP_RESAMPLES = 10000
+
+
+def _z(confidence):
+    """Квантиль нормального распределения для двустороннего интервала."""
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def wilson_interval(successes, total, confidence=0.95):
+    """Интервалы Уилсона для долей successes / total (векторно по всем битам)."""
+    successes = np.asarray(successes, dtype=np.float64)
+    z = _z(confidence)
+    p = successes / total
+    denom = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denom
+    half = z * np.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denom
+    return center - half, center + half
+
+
+def bootstrap_interval(successes, total, confidence=0.95, resamples=BOOTSTRAP_RESAMPLES, rng=None):
+    """
+    Бутстреп-интервалы (перцентильные) для долей successes / total.
+    Число верных предсказаний в бутстреп-выборке из total исходов бита имеет
+    биномиальное распределение, поэтому все выборки по всем битам
+    генерируются одним вызовом rng.binomial.
+    """
+    rng = np.random.default_rng(rng)
+    p = np.asarray(successes, dtype=np.float64) / total
+    samples = rng.binomial(total, p, size=(resamples,) + p.shape) / total
+    tail = (1 - confidence) / 2
+    low, high = np.quantile(samples, [tail, 1 - tail], axis=0)
+    return low, high
+
+
+# Коэффициенты чебышевского приближения erfc (Numerical Recipes, erfcc): относительная ошибка около 1e-7
+_ERFC_COEFFICIENTS = (-1.26551223, 1.00002368, 0.37409196, 0.09678418, -0.18628806,
+                      0.27886807, -1.13520398, 1.48851587, -0.82215223, 0.17087277)
+
+
+def erfc(x):
+    """Дополнительная функция ошибок erfc для массива (scipy.special.erfc, если scipy установлен)."""
+    x = np.asarray(x, dtype=np.float64)
+    if _scipy_erfc is not None:
+        return _scipy_erfc(x)
+    t = 1 / (1 + 0.5 * np.abs(x))
+    poly = np.zeros_like(t)
+    for coefficient in reversed(_ERFC_COEFFICIENTS):
+        poly = poly * t + coefficient
+    result = t * np.exp(poly - x * x)
+    return np.where(x >= 0, result, 2 - result)
+
+
+def binomial_pvalues(successes, total):
+    """
+    Двусторонние p-значения гипотезы "точность бита равна 50%"
+    (нормальное приближение биномиального распределения с поправкой на непрерывность).
+    """
+    successes = np.asarray(successes, dtype=np.float64)
+    z = np.maximum(np.abs(successes - total / 2) - 0.5, 0) / math.sqrt(total / 4)
+    return erfc(z / math.sqrt(2))
+
+
+def chi2_pvalues(statistic, df):
+    """
+    P-значения критерия хи-квадрат с df степенями свободы (векторно): при df = 1 через erfc,
+    иначе по нормальному приближению Уилсона - Хилферти.
+    """
+    statistic = np.maximum(np.asarray(statistic, dtype=np.float64), 0)
+    if df == 1:
+        return erfc(np.sqrt(statistic / 2))
+    scale = 2 / (9 * df)
+    z = (np.cbrt(statistic / df) - (1 - scale)) / math.sqrt(scale)
+    return erfc(z / math.sqrt(2)) / 2
+
+
+def bit_report(correct, predicted_ones, total, confidence=0.95, method='wilson', rng=None):
+    """
+    Статистика предсказания битов ключа по счетчикам (см. models.evaluation.count_correct_bits).
+    :param correct: число верных предсказаний каждого бита
+    :param predicted_ones: число предсказанных единиц каждого бита
+    :param total: число примеров
+    :return: словарь: сводка и массивы по битам (точность, смещение, интервал, p-значение)
+    """
+    if method not in CI_METHODS:
+        raise ValueError(f"Unsupported confidence interval method: {method}")
+    correct = np.asarray(correct)
+    key_bits = len(correct)
+    accuracy = correct / total
+    if method == 'wilson':
+        low, high = wilson_interval(correct, total, confidence)
+    else:
+        low, high = bootstrap_interval(correct, total, confidence, rng=rng)
+    pvalues = binomial_pvalues(correct, total)
+    # Бит предсказуем, если интервал не содержит 50%; с поправкой Бонферрони - по p-значению
+    significant = (low > 0.5) | (high < 0.5)
+    significant_bonferroni = pvalues < (1 - confidence) / key_bits
+    return {
+        'samples': int(total),
+        'key_bits': key_bits,
+        'confidence': confidence,
+        'ci_method': method,
+        'mean_accuracy': float(accuracy.mean()),
+        'significant_bits': int(significant.sum()),
+        'significant_bits_bonferroni': int(significant_bonferroni.sum()),
+        'bits': {
+            'accuracy': accuracy,
+            # Отклонение точности от 50% и доля предсказанных единиц относительно 50%
+            'advantage': accuracy - 0.5,
+            'bias': np.asarray(predicted_ones) / total - 0.5,
+            'ci_low': low,
+            'ci_high': high,
+            'p_value': pvalues,
+            'significant': significant,
+            'significant_bonferroni': significant_bonferroni,
+        },
+    }
+
+
+def exact_report(determined, confidence=0.95, method='gf2'):
+    """
+    Отчет в формате bit_report для точного (не статистического) анализа: определенные биты
+    предсказываются всегда верно, остальные - с вероятностью 50%.
+    :param determined: (key_bits,) bool, бит однозначно определяется по раундовому ключу
+    """
+    determined = np.asarray(determined, dtype=bool)
+    accuracy = np.where(determined, 1.0, 0.5)
+    return {
+        'samples': None,
+        'key_bits': len(determined),
+        'confidence': confidence,
+        'ci_method': method,
+        'mean_accuracy': float(accuracy.mean()),
+        'significant_bits': int(determined.sum()),
+        'significant_bits_bonferroni': int(determined.sum()),
+        'bits': {
+            'accuracy': accuracy,
+            'advantage': accuracy - 0.5,
+            'bias': np.zeros(len(determined)),
+            'ci_low': accuracy,
+            'ci_high': accuracy,
+            'p_value': np.where(determined, 0.0, 1.0),
+            'significant': determined,
+            'significant_bonferroni': determined,
+        },
+    }
+
+
+def save_report(report, json_path, csv_path, **config):
+    """
+    Отчет bit_report в JSON (сводка, конфигурация config и массивы по битам)
+    и CSV (строка на бит).
+    """
+    bits = report['bits']
+    with open(json_path, 'w') as f:
+        json.dump(dict(config, **{k: v for k, v in report.items() if k != 'bits'},
+                       bits={name: values.tolist() for name, values in bits.items()}),
+                  f, indent=2)
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['bit'] + list(bits))
+        for bit in range(report['key_bits']):
+            writer.writerow([bit] + [values[bit].item() for values in bits.values()])
@@ -0,0 +1,343 @@
+import json
+import os
+import shutil
+import zipfile
+import numpy as np
+from utils import profiling
+from utils.packed import (HEADER_SIZE, PACKED_EXT, PackedDataset, make_header, pack_records,
+                          read_header, write_header)
+from utils.registry import spec_fields
+
+COPY_BUFFER_SIZE = 16 << 20
+
+# Форматы датасета: имя -> расширение файла
+DATASET_FORMATS = {'npz': '.npz', 'packed': PACKED_EXT}
+
+
+class ChunkedDatasetWriter:
+    """
+    Потоковая запись датасета чанками (шардами) фиксированного размера.
+    Пока датасет не готов, массивы лежат в memory-mapped .npy файлах в каталоге
+    <path>.partial вместе с progress.json (число записанных шардов и seed);
+    прерванную генерацию можно продолжить с последнего записанного шарда.
+    В памяти одновременно находится только один шард.
+    """
+
+    def __init__(self, path, spec, num_samples, shard_size, key_bits, round_key_bits, seed=None):
+        """
+        :param path: итоговый файл датасета (.npz)
+        :param spec: DatasetSpec конфигурации
+        :param key_bits: длина мастер-ключа в битах
+        :param round_key_bits: длина сохраняемого раундового ключа в битах
+        :param seed: seed генерации (None - взять из незавершенной генерации или выбрать случайно)
+        """
+        self.path = path
+        self.partial_dir = os.path.splitext(path)[0] + ".partial"
+        self.progress_file = os.path.join(self.partial_dir, "progress.json")
+        self.shard_size = shard_size
+        self.num_samples = num_samples
+        self.arrays = {
+            'keys': (num_samples, key_bits),
+            'last_round_keys': (num_samples, round_key_bits),
+        }
+        self.params = {
+            'spec': list(spec_fields(spec).values()),
+            'num_samples': num_samples,
+            'shard_size': shard_size,
+            'shapes': {name: list(shape) for name, shape in self.arrays.items()},
+        }
+
+        progress = self._load_progress()
+        if progress is not None and (seed is None or progress['entropy'] == str(seed)):
+            self.entropy = int(progress['entropy'])
+            self.completed_shards = progress['completed_shards']
+        else:
+            self.entropy = np.random.SeedSequence(seed).entropy
+            self.completed_shards = 0
+            self._create()
+
+    def _load_progress(self):
+        """Состояние незавершенной генерации с теми же параметрами (или None)."""
+        try:
+            with open(self.progress_file) as f:
+                progress = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if progress.get('params') != self.params:
+            return None
+        return progress
+
+    def _create(self):
+        shutil.rmtree(self.partial_dir, ignore_errors=True)
+        os.makedirs(self.partial_dir)
+        for name, shape in self.arrays.items():
+            array = np.lib.format.open_memmap(self._array_path(name), mode='w+', dtype=np.uint8, shape=shape)
+            del array
+        self._save_progress()
+
+    def _array_path(self, name):
+        return os.path.join(self.partial_dir, f"{name}.npy")
+
+    def _save_progress(self):
+        tmp_file = self.progress_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({
+                'params': self.params,
+                'entropy': str(self.entropy),
+                'completed_shards': self.completed_shards,
+            }, f)
+        os.replace(tmp_file, self.progress_file)
+
+    @property
+    def num_shards(self):
+        return -(-self.num_samples // self.shard_size)
+
+    def write_shard(self, key_bits, last_round_keys):
+        """Запись очередного шарда и фиксация прогресса."""
+        start = self.completed_shards * self.shard_size
+        stop = start + len(key_bits)
+        for name, values in (('keys', key_bits), ('last_round_keys', last_round_keys)):
+            array = np.load(self._array_path(name), mmap_mode='r+')
+            array[start:stop] = values
+            array.flush()
+            del array
+        self.completed_shards += 1
+        self._save_progress()
+
+    def finalize(self):
+        """Сборка итогового .npz из memmap-файлов (запись потоковая) и удаление временных файлов."""
+        if self.completed_shards != self.num_shards:
+            raise RuntimeError(f"Dataset {self.path} is incomplete: {self.completed_shards}/{self.num_shards} shards")
+        tmp_path = os.path.splitext(self.path)[0] + ".tmp.npz"
+        # Член .npz - это обычный .npy файл, поэтому он копируется в архив блоками без отображения в память
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for name in self.arrays:
+                with open(self._array_path(name), "rb") as src, \
+                        archive.open(f"{name}.npy", "w", force_zip64=True) as dst:
+                    shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+        os.replace(tmp_path, self.path)
+        shutil.rmtree(self.partial_dir, ignore_errors=True)
+
+
+class PackedDatasetWriter:
+    """
+    Потоковая запись в упакованный формат (см. utils/packed.py). Записи дописываются
+    в <path>.partial, в заголовке которого хранится число готовых примеров и seed;
+    по завершении файл переименовывается в path. Интерфейс - как у ChunkedDatasetWriter.
+    """
+
+    def __init__(self, path, spec, num_samples, shard_size, key_bits, round_key_bits, seed=None):
+        self.path = path
+        self.partial_path = path + ".partial"
+        self.shard_size = shard_size
+        self.num_samples = num_samples
+        self.header = make_header(spec, num_samples, key_bits, round_key_bits)
+        self.header['shard_size'] = shard_size
+
+        existing = self._load_partial()
+        if existing is not None and (seed is None or existing['entropy'] == str(seed)):
+            self.header = existing
+            self.entropy = int(existing['entropy'])
+            self.completed_shards = existing['num_samples'] // shard_size
+        else:
+            self.entropy = np.random.SeedSequence(seed).entropy
+            self.header['entropy'] = str(self.entropy)
+            self.completed_shards = 0
+            with open(self.partial_path, "wb") as f:
+                write_header(f, self.header)
+
+    def _load_partial(self):
+        """Заголовок незавершенного файла с теми же параметрами (или None)."""
+        try:
+            header = read_header(self.partial_path)
+        except (OSError, ValueError):
+            return None
+        variable = ('num_samples', 'entropy')
+        fixed = lambda h: {k: v for k, v in h.items() if k not in variable}
+        if fixed(header) != fixed(self.header):
+            return None
+        return header
+
+    @property
+    def num_shards(self):
+        return -(-self.num_samples // self.shard_size)
+
+    def write_shard(self, key_bits, last_round_keys):
+        start = self.completed_shards * self.shard_size
+        with profiling.span('pack_bits', samples=len(key_bits)):
+            records = pack_records(self.header, keys=key_bits, last_round_keys=last_round_keys)
+        with open(self.partial_path, "r+b") as f:
+            f.seek(HEADER_SIZE + start * self.header['record_size'])
+            f.write(records.tobytes())
+            f.truncate()
+            self.header['num_samples'] = start + len(records)
+            write_header(f, self.header)
+        self.completed_shards += 1
+
+    def finalize(self):
+        if self.completed_shards != self.num_shards:
+            raise RuntimeError(f"Dataset {self.path} is incomplete: {self.completed_shards}/{self.num_shards} shards")
+        self.header['complete'] = True
+        with open(self.partial_path, "r+b") as f:
+            write_header(f, self.header)
+        os.replace(self.partial_path, self.path)
+
+
+def extend_dataset(path, chunks):
+    """
+    Дописывание примеров в конец готового датасета.
+    :param chunks: итератор пар (key_bits, last_round_keys)
+    :return: новое число примеров
+    """
+    if path.endswith(PACKED_EXT):
+        header = read_header(path)
+        with open(path, "r+b") as f:
+            for key_bits, last_round_keys in chunks:
+                records = pack_records(header, keys=key_bits, last_round_keys=last_round_keys)
+                f.seek(HEADER_SIZE + header['num_samples'] * header['record_size'])
+                f.write(records.tobytes())
+                f.truncate()
+                header['num_samples'] += len(records)
+                header['capacity'] = header['num_samples']
+                write_header(f, header)
+        return header['num_samples']
+
+    return _extend_npz(path, chunks)
+
+
+def _extend_npz(path, chunks):
+    """
+    Дописывание в .npz: новые примеры сначала пишутся в сырые файлы каталога <path>.extend,
+    затем архив пересобирается потоково (прежние данные члена копируются блоками,
+    за ними - новые), так что в памяти находится только текущий шард.
+    """
+    extend_dir = os.path.splitext(path)[0] + ".extend"
+    shutil.rmtree(extend_dir, ignore_errors=True)
+    os.makedirs(extend_dir)
+    names = ('keys', 'last_round_keys')
+    raw_paths = {name: os.path.join(extend_dir, f"{name}.bin") for name in names}
+    added = 0
+    try:
+        files = {name: open(raw_paths[name], "wb") for name in names}
+        try:
+            for key_bits, last_round_keys in chunks:
+                for name, values in zip(names, (key_bits, last_round_keys)):
+                    files[name].write(np.ascontiguousarray(values, dtype=np.uint8).tobytes())
+                added += len(key_bits)
+        finally:
+            for f in files.values():
+                f.close()
+
+        tmp_path = os.path.splitext(path)[0] + ".tmp.npz"
+        with zipfile.ZipFile(path) as source, \
+                zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for name in names:
+                with source.open(f"{name}.npy") as src, open(raw_paths[name], "rb") as extra:
+                    shape = _read_npy_header(src, path, name)
+                    with archive.open(f"{name}.npy", "w", force_zip64=True) as dst:
+                        _write_npy_header(dst, (shape[0] + added,) + shape[1:])
+                        shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+                        shutil.copyfileobj(extra, dst, COPY_BUFFER_SIZE)
+        os.replace(tmp_path, path)
+        return shape[0] + added
+    finally:
+        shutil.rmtree(extend_dir, ignore_errors=True)
+
+
+def _read_npy_header(f, path, name):
+    """Форма массива uint8 из заголовка .npy (позиция f - начало данных)."""
+    version = np.lib.format.read_magic(f)
+    read = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+    shape, fortran_order, dtype = read(f)
+    if fortran_order or dtype != np.uint8:
+        raise ValueError(f"Unexpected array {name} in {path}: {dtype}, fortran_order={fortran_order}")
+    return shape
+
+
+def _write_npy_header(f, shape):
+    np.lib.format.write_array_header_2_0(f, {'descr': np.lib.format.dtype_to_descr(np.dtype(np.uint8)),
+                                             'fortran_order': False, 'shape': shape})
+
+
+def open_dataset_writer(path, *args, **kwargs):
+    """Писатель датасета в формате, определяемом расширением path."""
+    writer = PackedDatasetWriter if path.endswith(PACKED_EXT) else ChunkedDatasetWriter
+    return writer(path, *args, **kwargs)
+
+
+class ArrayDataset:
+    """Датасет из матриц битов в памяти с интерфейсом PackedDataset."""
+
+    def __init__(self, keys, last_round_keys):
+        self._arrays = {'keys': keys, 'last_round_keys': last_round_keys}
+        self.num_samples = len(keys)
+
+    def __len__(self):
+        return self.num_samples
+
+    def num_bits(self, name):
+        return self._arrays[name].shape[1]
+
+    def unpack(self, name, rows):
+        return self._arrays[name][rows]
+
+    def keys(self, start=0, stop=None):
+        return self.unpack('keys', slice(start, stop))
+
+    def last_round_keys(self, start=0, stop=None):
+        return self.unpack('last_round_keys', slice(start, stop))
+
+
+class NpzDataset(ArrayDataset):
+    """Датасет .npz (сжатые массивы загружаются целиком; для датасетов больше памяти - формат .packed)."""
+
+    def __init__(self, path):
+        self.path = path
+        data = np.load(path)
+        super().__init__(data['keys'], data['last_round_keys'])
+
+
+class RoundSelection:
+    """
+    Ключи одного раунда датасета-траектории (last_round_keys - ключи раундов
+    trajectory подряд) с интерфейсом PackedDataset обычного датасета этого раунда.
+    """
+
+    def __init__(self, dataset, trajectory, rounds):
+        if rounds not in trajectory:
+            raise ValueError(f"Round {rounds} is not in the trajectory {list(trajectory)}")
+        self.dataset = dataset
+        self.width = dataset.num_bits('last_round_keys') // len(trajectory)
+        start = list(trajectory).index(rounds) * self.width
+        self.columns = slice(start, start + self.width)
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def num_bits(self, name):
+        return self.width if name == 'last_round_keys' else self.dataset.num_bits(name)
+
+    def unpack(self, name, rows):
+        values = self.dataset.unpack(name, rows)
+        return values[:, self.columns] if name == 'last_round_keys' else values
+
+    def keys(self, start=0, stop=None):
+        return self.unpack('keys', slice(start, stop))
+
+    def last_round_keys(self, start=0, stop=None):
+        return self.unpack('last_round_keys', slice(start, stop))
+
+
+def open_dataset(stem):
+    """
+    Открытие датасета по имени без расширения (например, data/simon_32_64_32_keys)
+    или по полному имени файла.
+    Упакованный формат предпочтительнее .npz, если есть оба файла.
+    """
+    for ext, dataset in ((PACKED_EXT, PackedDataset), ('.npz', NpzDataset)):
+        path = stem if stem.endswith(ext) else stem + ext
+        if os.path.exists(path):
+            # .npz загружается целиком, .packed только отображается в память
+            with profiling.span('open_dataset', format=ext):
+                return dataset(path)
+    raise FileNotFoundError(f"Датасет {stem} не найден ({', '.join(DATASET_FORMATS.values())})")